@@ -6,7 +6,9 @@ from api.models import (
     PlanetariumDome,
     Ticket,
     Reservation,
+    ShowSessionImportJob,
 )
+from api.pagination import EstimatedCountPaginator
 
 
 class ShowThemeAdmin(admin.ModelAdmin):
@@ -31,11 +33,28 @@ class PlanetariumDomeAdmin(admin.ModelAdmin):
 
 class TicketAdmin(admin.ModelAdmin):
     list_display = ("row", "seat", "show_session", "reservation")
+    list_select_related = ("show_session__astronomy_show", "reservation__user")
     ordering = ("-reservation__created_at",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class ReservationAdmin(admin.ModelAdmin):
     list_display = ("user", "created_at")
+    list_select_related = ("user",)
+    ordering = ("-created_at",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class ShowSessionImportJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "status",
+        "rows_processed",
+        "rows_failed",
+        "created_at",
+    )
     ordering = ("-created_at",)
 
 
@@ -45,3 +64,4 @@ admin.site.register(ShowSession, ShowSessionAdmin)
 admin.site.register(PlanetariumDome, PlanetariumDomeAdmin)
 admin.site.register(Ticket, TicketAdmin)
 admin.site.register(Reservation, ReservationAdmin)
+admin.site.register(ShowSessionImportJob, ShowSessionImportJobAdmin)
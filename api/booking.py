@@ -0,0 +1,217 @@
+from collections import defaultdict
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.http import Http404
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+from api.events import publish_tickets_booked_on_commit
+from api.models import Reservation, ShowSession, Ticket
+from api.response_cache import bump_model_versions_on_commit
+from api.seat_holds import get_seat_holders, hold_seats, release_seat_holds
+from api.seat_map import invalidate_seat_map
+from api.validators import UNIQUE_TICKET_CONSTRAINT, violated_constraint
+
+
+class SeatsUnavailable(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Some of the requested seats are already taken."
+    default_code = "seats_unavailable"
+
+    def __init__(self, seats):
+        super().__init__()
+        self.detail = {
+            "detail": self.detail,
+            "conflicts": [
+                {"show_session": show_session_id, "row": row, "seat": seat}
+                for show_session_id, row, seat in seats
+            ],
+        }
+
+
+def create_reservation(user, tickets):
+    """Create a reservation with a ticket per ``(show_session_id, row, seat)``.
+
+    The affected sessions are locked in primary key order for the duration
+    of the transaction, so concurrent bookings of the same session are
+    serialized and every conflicting seat is reported at once instead of
+    failing on the first unique constraint violation. Seats held by another
+    user count as conflicts; the user's own holds are released on commit.
+    Sessions that have already started cannot be booked. All tickets are
+    written with a single ``bulk_create`` and announced with one
+    ``tickets.booked`` event once committed. A seat taken by a write that
+    bypassed the lock is still reported as a conflict.
+
+    Raises ``ShowSession.DoesNotExist`` if a session is missing.
+    """
+    tickets = sorted(set(tickets))
+    show_session_ids = {show_session_id for show_session_id, _, _ in tickets}
+
+    try:
+        return _create_reservation(user, tickets, show_session_ids)
+    except IntegrityError as error:
+        if violated_constraint(error) != UNIQUE_TICKET_CONSTRAINT:
+            raise
+        raise SeatsUnavailable(_sold_seats(show_session_ids, tickets))
+
+
+def _create_reservation(user, tickets, show_session_ids):
+    with transaction.atomic():
+        locked = (
+            ShowSession.objects.select_for_update(of=("self",))
+            .select_related("astronomy_show", "planetarium_dome")
+            .filter(pk__in=show_session_ids)
+            .order_by("pk")
+        )
+        show_sessions = {
+            show_session.pk: show_session for show_session in locked
+        }
+        missing = show_session_ids - show_sessions.keys()
+        if missing:
+            raise ShowSession.DoesNotExist(
+                f"Show session {min(missing)} does not exist."
+            )
+
+        _validate_in_future(show_sessions)
+        _validate_in_dome(show_sessions, tickets)
+        seats_by_session = defaultdict(list)
+        for show_session_id, row, seat in tickets:
+            seats_by_session[show_session_id].append((row, seat))
+        conflicts = _sold_seats(show_session_ids, tickets) + _held_by_others(
+            user, seats_by_session
+        )
+        if conflicts:
+            raise SeatsUnavailable(sorted(set(conflicts)))
+
+        reservation = Reservation.objects.create(user=user)
+        created = Ticket.objects.bulk_create(
+            [
+                Ticket(
+                    show_session=show_sessions[show_session_id],
+                    reservation=reservation,
+                    row=row,
+                    seat=seat,
+                )
+                for show_session_id, row, seat in tickets
+            ]
+        )
+
+        for show_session_id, seats in seats_by_session.items():
+            ShowSession.adjust_tickets_sold(show_session_id, len(seats))
+            transaction.on_commit(
+                partial(invalidate_seat_map, show_session_id)
+            )
+            transaction.on_commit(
+                partial(release_seat_holds, show_session_id, seats)
+            )
+        bump_model_versions_on_commit(Ticket)
+        publish_tickets_booked_on_commit(user.email, reservation.pk, created)
+
+    return reservation, created
+
+
+def book_seats(user, show_session_id, seats):
+    """Book ``(row, seat)`` pairs of a show session under a new reservation."""
+    try:
+        show_session_id = int(show_session_id)
+    except ValueError:
+        raise Http404
+
+    try:
+        return create_reservation(
+            user, [(show_session_id, row, seat) for row, seat in seats]
+        )
+    except ShowSession.DoesNotExist:
+        raise Http404
+
+
+def hold_show_session_seats(user, show_session, seats, minutes):
+    """Hold unsold seats of a session for ``minutes``; return the expiry."""
+    tickets = [
+        (show_session.pk, row, seat) for row, seat in sorted(set(seats))
+    ]
+    _validate_in_future({show_session.pk: show_session})
+    _validate_in_dome({show_session.pk: show_session}, tickets)
+    conflicts = _sold_seats({show_session.pk}, tickets)
+    if conflicts:
+        raise SeatsUnavailable(conflicts)
+
+    expires_at, conflicts = hold_seats(
+        user,
+        show_session.pk,
+        [(row, seat) for _, row, seat in tickets],
+        minutes,
+    )
+    if conflicts:
+        raise SeatsUnavailable(
+            [(show_session.pk, row, seat) for row, seat in conflicts]
+        )
+
+    return expires_at
+
+
+def _validate_in_future(show_sessions):
+    started = sorted(
+        show_session_id
+        for show_session_id, show_session in show_sessions.items()
+        if show_session.show_time <= timezone.now()
+    )
+    if started:
+        raise serializers.ValidationError(
+            {
+                "show_session": [
+                    f"Show session {show_session_id} has already started."
+                    for show_session_id in started
+                ]
+            }
+        )
+
+
+def _validate_in_dome(show_sessions, tickets):
+    out_of_bounds = [
+        (show_session_id, row, seat)
+        for show_session_id, row, seat in tickets
+        if not _in_dome(show_sessions[show_session_id], row, seat)
+    ]
+    if out_of_bounds:
+        raise serializers.ValidationError(
+            {
+                "seats": [
+                    f"Row {row}, seat {seat} is not in the planetarium dome "
+                    f"of show session {show_session_id}."
+                    for show_session_id, row, seat in out_of_bounds
+                ]
+            }
+        )
+
+
+def _sold_seats(show_session_ids, tickets):
+    sold = set(
+        Ticket.objects.filter(
+            show_session__in=show_session_ids,
+            row__in={row for _, row, _ in tickets},
+        ).values_list("show_session_id", "row", "seat")
+    )
+    return [ticket for ticket in tickets if ticket in sold]
+
+
+def _held_by_others(user, seats_by_session):
+    return [
+        (show_session_id, row, seat)
+        for show_session_id, seats in seats_by_session.items()
+        for (row, seat), holder_id in get_seat_holders(
+            show_session_id, seats
+        ).items()
+        if holder_id != user.pk
+    ]
+
+
+def _in_dome(show_session, row, seat):
+    dome = show_session.planetarium_dome
+    return (
+        dome is not None
+        and 1 <= row <= dome.rows
+        and 1 <= seat <= dome.seats_in_row
+    )
@@ -0,0 +1,57 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, quote_etag
+from rest_framework import status
+
+from api.response_cache import get_model_versions
+
+
+class ConditionalGetMixin:
+    """Answer ``list`` and ``retrieve`` with an ETag.
+
+    The ETag is a digest of the request path and query string, the user and
+    the versions of ``conditional_models`` kept in ``api.response_cache``,
+    which every write to one of those models bumps. List each model the
+    serializer renders; the viewset's own model is used by default. Extend
+    ``get_etag_parts`` with any other state the response depends on. A
+    matching ``If-None-Match`` gets a 304 without touching the database.
+    """
+
+    conditional_actions = ("list", "retrieve")
+    conditional_models = ()
+
+    def get_conditional_models(self):
+        return self.conditional_models or (self.queryset.model,)
+
+    def get_etag_parts(self, request):
+        user = request.user.pk if request.user.is_authenticated else None
+        versions = get_model_versions(self.get_conditional_models())
+        return (request.get_full_path(), user, versions)
+
+    def get_etag(self, request):
+        digest = hashlib.md5(
+            repr(self.get_etag_parts(request)).encode()
+        ).hexdigest()
+        return quote_etag(digest)
+
+    def conditional(self, handler, request, *args, **kwargs):
+        if self.action not in self.conditional_actions:
+            return handler(request, *args, **kwargs)
+
+        # Read before the handler, so a write racing with it can only make
+        # the ETag older than the body, never newer.
+        etag = self.get_etag(request)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+
+        response["ETag"] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,349 @@
+import csv
+import io
+from datetime import datetime, timedelta
+
+import faker
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from api.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    ShowTheme,
+    Ticket,
+)
+from api.response_cache import bump_model_versions
+
+User = get_user_model()
+
+# Rows generated per unit of scale; ``scale=100`` gives 1k domes, 100k shows
+# and 10M show sessions and tickets.
+VOLUMES = {
+    "show_themes": 20,
+    "astronomy_shows": 1_000,
+    "planetarium_domes": 10,
+    "users": 1_000,
+    "show_sessions": 100_000,
+    "tickets": 100_000,
+}
+THEMES_PER_SHOW = 3
+MAX_TICKETS_PER_RESERVATION = 4
+
+
+def volumes_for(scale):
+    volumes = {
+        name: max(1, round(count * scale)) for name, count in VOLUMES.items()
+    }
+    volumes["show_themes"] = max(THEMES_PER_SHOW, volumes["show_themes"])
+    return volumes
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+
+class TableLoader:
+    """Write rows given as columns, with ``bulk_create`` or PostgreSQL COPY."""
+
+    def __init__(self, use_copy=False, batch_size=10_000):
+        self.use_copy = use_copy
+        self.batch_size = batch_size
+
+    def load(self, model, columns):
+        fields = list(columns)
+        rows = list(
+            zip(
+                *(
+                    (
+                        values.tolist()
+                        if isinstance(values, np.ndarray)
+                        else values
+                    )
+                    for values in columns.values()
+                )
+            )
+        )
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start : start + self.batch_size]
+            if self.use_copy:
+                self.copy(model, fields, batch)
+            else:
+                model.objects.bulk_create(
+                    [model(**dict(zip(fields, row))) for row in batch],
+                    batch_size=self.batch_size,
+                )
+        return len(rows)
+
+    @staticmethod
+    def copy(model, fields, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        columns = ", ".join(
+            connection.ops.quote_name(model._meta.get_field(field).column)
+            for field in fields
+        )
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {connection.ops.quote_name(model._meta.db_table)} "
+                f"({columns}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+
+
+class DatasetGenerator:
+    """Generate a collision-free planetarium dataset of a given scale.
+
+    Primary keys are assigned up front from the current maximum, so foreign
+    keys are computed with NumPy instead of read back from the database.
+    Every dome gets one session per hour, starting after the latest existing
+    session, which keeps the one-hour spacing rule without any checks.
+    Sessions are written in chunks together with their reservations and
+    tickets; seats are taken from a random offset in each dome, so they
+    never repeat within a session.
+    """
+
+    def __init__(
+        self,
+        scale=1.0,
+        seed=None,
+        use_copy=False,
+        batch_size=10_000,
+        password="password",
+        log=None,
+    ):
+        self.volumes = volumes_for(scale)
+        self.rng = np.random.default_rng(seed)
+        self.fake = faker.Faker()
+        self.fake.seed_instance(seed)
+        self.loader = TableLoader(use_copy=use_copy, batch_size=batch_size)
+        self.batch_size = batch_size
+        self.password = password
+        self.log = log or (lambda message: None)
+
+    def run(self):
+        self.now = datetime.now()
+        self.words = np.array(self.fake.words(1_000))
+        self.descriptions = [self.fake.text() for _ in range(100)]
+
+        with transaction.atomic():
+            themes = self.create_show_themes()
+            shows = self.create_astronomy_shows(themes)
+            domes = self.create_planetarium_domes()
+            users = self.create_users()
+        self.create_show_sessions(shows, domes, users)
+
+        self.reset_sequences()
+        bump_model_versions(
+            ShowTheme,
+            AstronomyShow,
+            PlanetariumDome,
+            ShowSession,
+            Reservation,
+            Ticket,
+        )
+
+    def names(self, prefix_words, ids):
+        picks = self.words[self.rng.integers(len(self.words), size=len(ids))]
+        return [
+            f"{prefix_words} {word.title()} {pk}".strip()
+            for word, pk in zip(picks, ids)
+        ]
+
+    def create_show_themes(self):
+        ids = np.arange(self.volumes["show_themes"]) + next_id(ShowTheme)
+        self.loader.load(
+            ShowTheme,
+            {
+                "id": ids,
+                "name": self.names("", ids),
+            },
+        )
+        self.log(f"Created {len(ids)} show themes.")
+        return ids
+
+    def create_astronomy_shows(self, themes):
+        count = self.volumes["astronomy_shows"]
+        ids = np.arange(count) + next_id(AstronomyShow)
+        self.loader.load(
+            AstronomyShow,
+            {
+                "id": ids,
+                "title": self.names("The", ids),
+                "description": [
+                    self.descriptions[index]
+                    for index in self.rng.integers(
+                        len(self.descriptions), size=count
+                    )
+                ],
+            },
+        )
+
+        # base, base + step, base + 2 * step are distinct modulo the theme
+        # count as long as 2 * step < len(themes).
+        base = self.rng.integers(len(themes), size=count)
+        step = self.rng.integers(1, max(2, (len(themes) + 1) // 2), size=count)
+        offsets = np.arange(THEMES_PER_SHOW) * step[:, None]
+        picked = themes[(base[:, None] + offsets) % len(themes)]
+        self.loader.load(
+            AstronomyShow.show_theme.through,
+            {
+                "astronomyshow_id": np.repeat(ids, THEMES_PER_SHOW),
+                "showtheme_id": picked.ravel(),
+            },
+        )
+        self.log(f"Created {count} astronomy shows.")
+        return ids
+
+    def create_planetarium_domes(self):
+        count = self.volumes["planetarium_domes"]
+        ids = np.arange(count) + next_id(PlanetariumDome)
+        rows = self.rng.integers(10, 51, size=count)
+        seats_in_row = self.rng.integers(5, 21, size=count)
+        self.loader.load(
+            PlanetariumDome,
+            {
+                "id": ids,
+                "name": self.names("Dome", ids),
+                "rows": rows,
+                "seats_in_row": seats_in_row,
+            },
+        )
+        self.log(f"Created {count} planetarium domes.")
+        return {
+            "ids": ids,
+            "capacity": rows * seats_in_row,
+            "seats_in_row": seats_in_row,
+        }
+
+    def create_users(self):
+        count = self.volumes["users"]
+        first_id = next_id(User)
+        password = make_password(self.password)
+        User.objects.bulk_create(
+            [
+                User(
+                    id=first_id + index,
+                    email=f"user{first_id + index}@planetarium.test",
+                    password=password,
+                )
+                for index in range(count)
+            ],
+            batch_size=self.batch_size,
+        )
+        self.log(f"Created {count} users (password: {self.password!r}).")
+        return np.arange(count) + first_id
+
+    def create_show_sessions(self, shows, domes, users):
+        total = self.volumes["show_sessions"]
+        tickets_per_session = self.volumes["tickets"] / total
+        last = ShowSession.objects.aggregate(last=Max("show_time"))["last"]
+        start = max(
+            self.now + timedelta(days=1),
+            (last or self.now) + timedelta(hours=1),
+        ).replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        session_id = next_id(ShowSession)
+        reservation_id = next_id(Reservation)
+        ticket_id = next_id(Ticket)
+        dome_count = len(domes["ids"])
+
+        created = tickets_created = 0
+        for offset in range(0, total, self.batch_size):
+            index = np.arange(offset, min(offset + self.batch_size, total))
+            count = len(index)
+            ids = index - offset + session_id
+            dome = index % dome_count
+            capacity = domes["capacity"][dome]
+            sold = np.minimum(
+                self.rng.poisson(tickets_per_session, size=count), capacity
+            )
+
+            # Tickets: consecutive seats from a random offset within the dome.
+            ticket_session = np.repeat(np.arange(count), sold)
+            position = np.arange(len(ticket_session)) - np.repeat(
+                np.cumsum(sold) - sold, sold
+            )
+            seat_index = (
+                self.rng.integers(capacity)[ticket_session] + position
+            ) % capacity[ticket_session]
+            row, seat = np.divmod(
+                seat_index, domes["seats_in_row"][dome][ticket_session]
+            )
+
+            # Reservations: runs of up to four tickets of the same session.
+            new_reservation = (
+                position % MAX_TICKETS_PER_RESERVATION == 0
+            ) | (self.rng.random(len(ticket_session)) < 0.4)
+            ticket_reservation = (
+                np.cumsum(new_reservation) - 1 + reservation_id
+            )
+            reservation_count = int(new_reservation.sum())
+
+            with transaction.atomic():
+                self.loader.load(
+                    ShowSession,
+                    {
+                        "id": ids,
+                        "astronomy_show_id": shows[
+                            self.rng.integers(len(shows), size=count)
+                        ],
+                        "planetarium_dome_id": domes["ids"][dome],
+                        "show_time": [
+                            start + timedelta(hours=int(hours))
+                            for hours in index // dome_count
+                        ],
+                        "tickets_sold": sold,
+                    },
+                )
+                self.loader.load(
+                    Reservation,
+                    {
+                        "id": np.arange(reservation_count) + reservation_id,
+                        "user_id": users[
+                            self.rng.integers(
+                                len(users), size=reservation_count
+                            )
+                        ],
+                        "created_at": [self.now] * reservation_count,
+                    },
+                )
+                self.loader.load(
+                    Ticket,
+                    {
+                        "id": np.arange(len(ticket_session)) + ticket_id,
+                        "row": row + 1,
+                        "seat": seat + 1,
+                        "show_session_id": ids[ticket_session],
+                        "reservation_id": ticket_reservation,
+                    },
+                )
+
+            session_id += count
+            reservation_id += reservation_count
+            ticket_id += len(ticket_session)
+            created += count
+            tickets_created += len(ticket_session)
+            self.log(
+                f"Created {created}/{total} show sessions, "
+                f"{tickets_created} tickets."
+            )
+
+    def reset_sequences(self):
+        models = [
+            ShowTheme,
+            AstronomyShow,
+            PlanetariumDome,
+            User,
+            ShowSession,
+            Reservation,
+            Ticket,
+        ]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
@@ -0,0 +1,89 @@
+import json
+import logging
+from functools import cache
+
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class LocalEventStream:
+    """Keeps published events in memory, used by tests."""
+
+    def __init__(self):
+        self.events = []
+
+    def publish(self, event):
+        self.events.append(event)
+
+
+class RedisEventStream:
+    """Events appended as JSON to a capped Redis stream.
+
+    Consumers read it through a consumer group, so every event is handled
+    by one of them, e.g. one Telegram bot replica.
+    """
+
+    def __init__(
+        self, url, stream="planetarium:ticket-events", maxlen=100_000
+    ):
+        self._client = redis.Redis.from_url(url)
+        self.stream = stream
+        self.maxlen = maxlen
+
+    def publish(self, event):
+        self._client.xadd(
+            self.stream,
+            {"event": json.dumps(event, cls=DjangoJSONEncoder)},
+            maxlen=self.maxlen,
+            approximate=True,
+        )
+
+
+@cache
+def get_event_stream():
+    config = settings.TICKET_EVENTS
+    return import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+
+
+def publish_event(event):
+    try:
+        get_event_stream().publish(event)
+    except redis.RedisError:
+        # Notifications are best effort; the booking itself is committed.
+        logger.exception("Could not publish %s event", event["type"])
+
+
+def tickets_booked_event(email, reservation_id, tickets):
+    """A compact event with everything needed to notify the ticket owner.
+
+    The tickets must have their session, show and dome loaded.
+    """
+    return {
+        "type": "tickets.booked",
+        "email": email,
+        "reservation": reservation_id,
+        "tickets": [
+            {
+                "title": ticket.show_session.astronomy_show.title,
+                "show_time": ticket.show_session.show_time,
+                "dome": (
+                    ticket.show_session.planetarium_dome.name
+                    if ticket.show_session.planetarium_dome
+                    else None
+                ),
+                "row": ticket.row,
+                "seat": ticket.seat,
+            }
+            for ticket in tickets
+        ],
+    }
+
+
+def publish_tickets_booked_on_commit(email, reservation_id, tickets):
+    event = tickets_booked_event(email, reservation_id, tickets)
+    transaction.on_commit(lambda: publish_event(event))
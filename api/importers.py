@@ -0,0 +1,214 @@
+import codecs
+import csv
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+
+from api.models import AstronomyShow, PlanetariumDome, ShowSession
+from api.response_cache import bump_model_versions_on_commit
+from api.serializers.planetarium_serializers import ShowSessionImportSerializer
+from api.validators import (
+    SHOW_TIME_CONFLICT_MESSAGE,
+    SHOW_TIME_SPACING,
+    is_show_time_conflict,
+)
+
+
+def iter_lines(chunks, encoding="utf-8"):
+    """Decode byte chunks incrementally and yield lines with their endings."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def iter_csv_rows(uploaded_file, encoding="utf-8"):
+    """Stream dict rows from an uploaded CSV file without reading it whole."""
+    return csv.DictReader(iter_lines(uploaded_file.chunks(), encoding))
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class ShowSchedule:
+    """In-memory index of show times per (astronomy show, dome) pair."""
+
+    def __init__(self):
+        self._times = defaultdict(list)
+
+    def add(self, astronomy_show_id, planetarium_dome_id, show_time):
+        times = self._times[(astronomy_show_id, planetarium_dome_id)]
+        index = bisect_left(times, show_time)
+        if index == len(times) or times[index] != show_time:
+            times.insert(index, show_time)
+
+    def has_conflict(self, astronomy_show_id, planetarium_dome_id, show_time):
+        """Mirror the exclusion constraint: a show less than an hour away."""
+        times = self._times.get((astronomy_show_id, planetarium_dome_id), ())
+        index = bisect_right(times, show_time - SHOW_TIME_SPACING)
+        return (
+            index < len(times)
+            and times[index] < show_time + SHOW_TIME_SPACING
+        )
+
+
+class ShowSessionImporter:
+    """Validate and insert show sessions from CSV rows with set-based queries.
+
+    Rows are consumed in batches. For every batch, unseen show titles and
+    dome names are resolved with one query each, the spacing rule is checked
+    in memory against the batch and the sessions already in the database,
+    including those written by earlier batches, and the accepted rows are
+    written with ``bulk_create``. Only one batch of show times is held at a
+    time. Sessions committed by a parallel import in the meantime are caught
+    by the exclusion constraint, in which case the batch is retried row by
+    row to report the conflicting rows.
+    """
+
+    serializer_class = ShowSessionImportSerializer
+    show_time_format = "%Y-%m-%d %H:%M:%S"
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.context = {"astronomy_shows": {}, "planetarium_domes": {}}
+
+    def run(self, rows):
+        """Import every row in one transaction; return the created sessions.
+
+        The created sessions are all kept, so this is only meant for small
+        files; import jobs call ``import_batch`` instead.
+        """
+        created = []
+        errors = []
+
+        with transaction.atomic():
+            for batch in batched(rows, self.batch_size):
+                sessions, batch_errors = self.import_batch(batch)
+                created.extend(sessions)
+                errors.extend(batch_errors)
+
+        return created, errors
+
+    def import_batch(self, rows):
+        self._resolve(
+            "astronomy_shows", AstronomyShow, "title", rows, "astronomy_show"
+        )
+        self._resolve(
+            "planetarium_domes",
+            PlanetariumDome,
+            "name",
+            rows,
+            "planetarium_dome",
+        )
+        row_serializers = [
+            self.serializer_class(data=row, context=self.context)
+            for row in rows
+        ]
+        valid = [
+            serializer
+            for serializer in row_serializers
+            if serializer.is_valid()
+        ]
+        schedule = ShowSchedule()
+        self._load_existing(
+            schedule, [serializer.validated_data for serializer in valid]
+        )
+
+        sessions = []
+        errors = []
+        for row, serializer in zip(rows, row_serializers):
+            if serializer.errors:
+                errors.append(serializer.errors)
+                continue
+
+            data = serializer.validated_data
+            show_id = data["astronomy_show"].pk
+            dome_id = data["planetarium_dome"].pk
+            if schedule.has_conflict(show_id, dome_id, data["show_time"]):
+                errors.append(
+                    {"non_field_errors": [SHOW_TIME_CONFLICT_MESSAGE]}
+                )
+                continue
+
+            try:
+                datetime.strptime(row["show_time"], self.show_time_format)
+            except ValueError:
+                errors.append(
+                    "Invalid datetime format for show_time: {}".format(
+                        row["show_time"]
+                    )
+                )
+                continue
+
+            schedule.add(show_id, dome_id, data["show_time"])
+            sessions.append(ShowSession(**data))
+
+        try:
+            with transaction.atomic():
+                ShowSession.objects.bulk_create(sessions)
+        except IntegrityError as error:
+            if not is_show_time_conflict(error):
+                raise
+            sessions, conflicts = self._create_each(sessions)
+            errors.extend(conflicts)
+        if sessions:
+            bump_model_versions_on_commit(ShowSession)
+        return sessions, errors
+
+    def _create_each(self, sessions):
+        created = []
+        conflicts = []
+        for session in sessions:
+            try:
+                with transaction.atomic():
+                    ShowSession.objects.bulk_create([session])
+            except IntegrityError as error:
+                if not is_show_time_conflict(error):
+                    raise
+                conflicts.append(
+                    {"non_field_errors": [SHOW_TIME_CONFLICT_MESSAGE]}
+                )
+            else:
+                created.append(session)
+        return created, conflicts
+
+    def _resolve(self, context_key, model, field_name, rows, column):
+        resolved = self.context[context_key]
+        values = {row.get(column) for row in rows} - resolved.keys()
+        values = [value for value in values if isinstance(value, str)]
+        if values:
+            resolved.update(
+                model.objects.in_bulk(values, field_name=field_name)
+            )
+
+    def _load_existing(self, schedule, validated_rows):
+        if not validated_rows:
+            return
+
+        show_times = [data["show_time"] for data in validated_rows]
+        existing = ShowSession.objects.filter(
+            astronomy_show__in={
+                data["astronomy_show"] for data in validated_rows
+            },
+            planetarium_dome__in={
+                data["planetarium_dome"] for data in validated_rows
+            },
+            show_time__gt=min(show_times) - SHOW_TIME_SPACING,
+            show_time__lt=max(show_times) + SHOW_TIME_SPACING,
+        ).values_list("astronomy_show_id", "planetarium_dome_id", "show_time")
+
+        for astronomy_show_id, planetarium_dome_id, show_time in existing:
+            schedule.add(astronomy_show_id, planetarium_dome_id, show_time)
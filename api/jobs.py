@@ -0,0 +1,157 @@
+import logging
+import queue
+import threading
+from datetime import timedelta
+from functools import cache
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from api.importers import ShowSessionImporter, batched, iter_csv_rows
+from api.models import ShowSessionImportJob
+
+logger = logging.getLogger(__name__)
+
+STALE_JOB_MESSAGE = "The import worker stopped before the job finished."
+
+
+class LocalJobQueue:
+    """In-process queue, used by tests and single-process development.
+
+    With ``worker_thread`` enabled, a daemon thread drains the queue;
+    otherwise jobs run when ``run_worker(queue, burst=True)`` is called.
+    """
+
+    def __init__(self, worker_thread=False):
+        self._queue = queue.Queue()
+        self._worker_thread = worker_thread
+        self._thread = None
+
+    def enqueue(self, job_id):
+        self._queue.put(str(job_id))
+        if self._worker_thread and self._thread is None:
+            self._thread = threading.Thread(
+                target=run_worker, args=(self,), daemon=True
+            )
+            self._thread.start()
+
+    def dequeue(self, timeout=None):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class RedisJobQueue:
+    """Job ids kept in a Redis list, consumed by ``run_import_worker``."""
+
+    def __init__(self, url, key="planetarium:show-session-import-jobs"):
+        self._client = redis.Redis.from_url(url)
+        self.key = key
+
+    def enqueue(self, job_id):
+        self._client.lpush(self.key, str(job_id))
+
+    def dequeue(self, timeout=None):
+        item = self._client.brpop(self.key, timeout=timeout or 0)
+        return item[1].decode() if item else None
+
+
+@cache
+def get_job_queue():
+    config = settings.SHOW_SESSION_IMPORT_QUEUE
+    return import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+
+
+def enqueue_import_job(job):
+    transaction.on_commit(lambda: get_job_queue().enqueue(job.pk))
+
+
+def process_import_job(job_id):
+    claimed = ShowSessionImportJob.objects.filter(
+        pk=job_id, status=ShowSessionImportJob.Status.PENDING
+    ).update(
+        status=ShowSessionImportJob.Status.RUNNING, started_at=timezone.now()
+    )
+    if not claimed:
+        return
+
+    job = ShowSessionImportJob.objects.get(pk=job_id)
+    importer = ShowSessionImporter()
+    status = ShowSessionImportJob.Status.FINISHED
+    try:
+        with job.file.open("rb") as csv_file:
+            for batch in batched(iter_csv_rows(csv_file), importer.batch_size):
+                with transaction.atomic():
+                    _, errors = importer.import_batch(batch)
+                    running = job.record_batch(len(batch), errors)
+                    if not running:
+                        # Failed as stale meanwhile; keep this batch out.
+                        transaction.set_rollback(True)
+                if not running:
+                    break
+    except Exception as exc:
+        logger.exception("Show session import job %s failed", job_id)
+        status = ShowSessionImportJob.Status.FAILED
+        job.errors.append(str(exc))
+    finally:
+        job.file.delete(save=False)
+        finished = ShowSessionImportJob.objects.filter(
+            pk=job_id, status=ShowSessionImportJob.Status.RUNNING
+        ).update(
+            status=status,
+            errors=job.errors,
+            file="",
+            finished_at=timezone.now(),
+        )
+        if not finished:
+            logger.warning(
+                "Show session import job %s was failed while it ran",
+                job_id,
+            )
+
+
+def fail_stale_jobs():
+    """Fail jobs running for longer than ``SHOW_SESSION_IMPORT_JOB_TIMEOUT``.
+
+    A job stays running when its worker dies in the middle of the import.
+    It is failed rather than queued again, as its committed batches would
+    otherwise be imported twice.
+    """
+    cutoff = timezone.now() - timedelta(
+        seconds=settings.SHOW_SESSION_IMPORT_JOB_TIMEOUT
+    )
+    stale = ShowSessionImportJob.objects.filter(
+        status=ShowSessionImportJob.Status.RUNNING, started_at__lt=cutoff
+    )
+    for job in stale:
+        failed = ShowSessionImportJob.objects.filter(
+            pk=job.pk, status=ShowSessionImportJob.Status.RUNNING
+        ).update(
+            status=ShowSessionImportJob.Status.FAILED,
+            errors=[*job.errors, STALE_JOB_MESSAGE],
+            finished_at=timezone.now(),
+        )
+        if failed:
+            logger.warning("Show session import job %s timed out", job.pk)
+            job.file.delete(save=False)
+
+
+def run_worker(job_queue, burst=False, timeout=5):
+    """Process queued jobs; with ``burst`` stop once the queue is empty.
+
+    Jobs abandoned by a crashed worker are failed on start and whenever
+    the queue is idle.
+    """
+    fail_stale_jobs()
+    while True:
+        job_id = job_queue.dequeue(timeout=timeout if not burst else 0.01)
+        if job_id is None:
+            if burst:
+                return
+            fail_stale_jobs()
+            continue
+        process_import_job(job_id)
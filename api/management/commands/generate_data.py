@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.datagen import DatasetGenerator, volumes_for
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a load-testing dataset. Scale 1 creates 10 domes, 1k shows "
+        "and 100k show sessions and tickets; the volumes grow linearly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="Multiplier applied to the base volumes.",
+        )
+        parser.add_argument(
+            "--seed", type=int, help="Seed for reproducible datasets."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10_000,
+            help="Rows written per bulk_create or COPY statement.",
+        )
+        parser.add_argument(
+            "--copy",
+            action="store_true",
+            help="Load rows with PostgreSQL COPY instead of bulk_create.",
+        )
+        parser.add_argument(
+            "--password",
+            default="password",
+            help="Password of the generated users.",
+        )
+
+    def handle(self, *args, **options):
+        if options["scale"] <= 0:
+            raise CommandError("--scale must be positive.")
+
+        for name, count in volumes_for(options["scale"]).items():
+            self.stdout.write(f"{name}: {count}")
+
+        DatasetGenerator(
+            scale=options["scale"],
+            seed=options["seed"],
+            use_copy=options["copy"],
+            batch_size=options["batch_size"],
+            password=options["password"],
+            log=self.stdout.write,
+        ).run()
+        self.stdout.write(self.style.SUCCESS("Dataset generated."))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from api.models import ShowSession, Ticket
+from api.response_cache import bump_model_versions
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount sold tickets and fix drifted ShowSession.tickets_sold "
+        "values."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the sessions whose counter has drifted.",
+        )
+
+    def handle(self, *args, **options):
+        actual = Coalesce(
+            Subquery(
+                Ticket.objects.filter(show_session=OuterRef("pk"))
+                .order_by()
+                .values("show_session")
+                .annotate(count=Count("pk"))
+                .values("count")
+            ),
+            0,
+        )
+        drifted = ShowSession.objects.annotate(actual=actual).exclude(
+            tickets_sold=F("actual")
+        )
+
+        if options["dry_run"]:
+            rows = drifted.values_list("pk", "tickets_sold", "actual")
+            for show_session_id, tickets_sold, actual_count in rows:
+                self.stdout.write(
+                    f"Show session {show_session_id}: "
+                    f"{tickets_sold} counted, {actual_count} sold"
+                )
+            return
+
+        updated = ShowSession.objects.filter(
+            pk__in=drifted.values("pk")
+        ).update(tickets_sold=actual)
+        if updated:
+            bump_model_versions(ShowSession)
+        self.stdout.write(
+            self.style.SUCCESS(f"Reconciled {updated} show sessions.")
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from api.jobs import get_job_queue, run_worker
+
+
+class Command(BaseCommand):
+    help = "Process queued show session CSV import jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once the queue is empty instead of waiting for new "
+            "jobs.",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Waiting for show session import jobs...")
+        run_worker(get_job_queue(), burst=options["burst"])
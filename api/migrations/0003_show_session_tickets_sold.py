@@ -0,0 +1,38 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:51
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_tickets_sold(apps, schema_editor):
+    ShowSession = apps.get_model("api", "ShowSession")
+    Ticket = apps.get_model("api", "Ticket")
+    ShowSession.objects.update(
+        tickets_sold=Coalesce(
+            Subquery(
+                Ticket.objects.filter(show_session=OuterRef("pk"))
+                .order_by()
+                .values("show_session")
+                .annotate(count=Count("pk"))
+                .values("count")
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_show_session_import_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="showsession",
+            name="tickets_sold",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_tickets_sold, migrations.RunPython.noop),
+    ]
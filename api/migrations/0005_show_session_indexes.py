@@ -0,0 +1,36 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:01
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking writes to a large show session table.
+    atomic = False
+
+    dependencies = [
+        ("api", "0003_show_session_tickets_sold"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="showsession",
+            index=models.Index(
+                fields=["show_time", "id"], name="show_session_time_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="showsession",
+            index=models.Index(
+                fields=["planetarium_dome", "show_time"],
+                name="show_session_dome_time_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="showsession",
+            index=models.Index(
+                fields=["astronomy_show", "planetarium_dome", "show_time"],
+                name="show_session_conflict_idx",
+            ),
+        ),
+    ]
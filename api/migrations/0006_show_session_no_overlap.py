@@ -0,0 +1,90 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:11
+
+import logging
+from datetime import timedelta
+
+import api.models
+import django.contrib.postgres.constraints
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+
+def detach_overlapping_sessions(apps, schema_editor):
+    """Take later overlapping sessions off their dome so the constraint fits.
+
+    Of two sessions of the same show in the same dome less than an hour
+    apart, the earlier one keeps the dome. Later sessions without tickets
+    are detached and their ids logged so staff can move them to a free
+    slot. If any of them has tickets, nothing is changed and the migration
+    stops with their ids instead, since a session with tickets must keep
+    its dome.
+    """
+    ShowSession = apps.get_model("api", "ShowSession")
+    Ticket = apps.get_model("api", "Ticket")
+    detached = []
+    previous = None
+    sessions = (
+        ShowSession.objects.filter(planetarium_dome__isnull=False)
+        .order_by("astronomy_show", "planetarium_dome", "show_time")
+        .values_list("pk", "astronomy_show", "planetarium_dome", "show_time")
+    )
+    for pk, show, dome, show_time in sessions.iterator():
+        if (
+            previous is not None
+            and previous[:2] == (show, dome)
+            and show_time < previous[2] + timedelta(hours=1)
+        ):
+            detached.append(pk)
+        else:
+            previous = (show, dome, show_time)
+
+    if not detached:
+        return
+
+    sold = sorted(
+        Ticket.objects.filter(show_session__in=detached)
+        .order_by()
+        .values_list("show_session", flat=True)
+        .distinct()
+    )
+    if sold:
+        raise RuntimeError(
+            "These show sessions have tickets and overlap an earlier session "
+            "of the same show in the same dome: %s. Move them to a free slot "
+            "and run the migration again." % ", ".join(map(str, sold))
+        )
+
+    ShowSession.objects.filter(pk__in=detached).update(planetarium_dome=None)
+    logger.warning(
+        "Removed the dome from %d show sessions overlapping an earlier one: "
+        "%s",
+        len(detached),
+        ", ".join(map(str, detached)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_show_session_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            detach_overlapping_sessions, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="showsession",
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(
+                condition=models.Q(("planetarium_dome__isnull", False)),
+                expressions=[
+                    (api.models.PointRange("astronomy_show"), "&&"),
+                    (api.models.PointRange("planetarium_dome"), "&&"),
+                    (api.models.ShowTimeRange("show_time"), "&&"),
+                ],
+                name="show_session_no_overlap",
+                violation_error_message="Show time must be at least 1 hour apart from the previous show time.",
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:16
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the index without locking writes to a large ticket table; it
+    # replaces the single-column index of the reservation foreign key.
+    atomic = False
+
+    dependencies = [
+        ("api", "0006_show_session_no_overlap"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="ticket",
+            index=models.Index(
+                fields=["reservation", "show_session"],
+                name="ticket_reservation_session_idx",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="ticket",
+            name="reservation",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="tickets",
+                to="api.reservation",
+            ),
+        ),
+    ]
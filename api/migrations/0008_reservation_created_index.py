@@ -0,0 +1,22 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the index without locking writes to the reservation table.
+    atomic = False
+
+    dependencies = [
+        ("api", "0007_ticket_reservation_session_index"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="reservation",
+            index=models.Index(
+                fields=["created_at", "id"], name="reservation_created_idx"
+            ),
+        ),
+    ]
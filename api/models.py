@@ -1,9 +1,37 @@
+import uuid
+from contextlib import nullcontext
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import (
+    BigIntegerRangeField,
+    DateTimeRangeField,
+    RangeOperators,
+)
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models import DateTimeField, ForeignKey, UniqueConstraint
-
-from api.validators import validate_show_time
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import (
+    DateTimeField,
+    F,
+    ForeignKey,
+    Func,
+    Q,
+    UniqueConstraint,
+    Value,
+)
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from api.response_cache import bump_model_versions_on_commit
+from api.validators import (
+    SHOW_TIME_CONFLICT_CONSTRAINT,
+    SHOW_TIME_CONFLICT_MESSAGE,
+    SHOW_TIME_SPACING,
+    UNIQUE_TICKET_CONSTRAINT,
+    is_show_time_conflict,
+    validate_show_time_in_future,
+)
 
 User = get_user_model()
 
@@ -33,6 +61,40 @@ class AstronomyShow(models.Model):
         return self.title
 
 
+class PointRange(Func):
+    """``int8range(id, id, '[]')``: two ids are equal iff their ranges overlap.
+
+    Lets the exclusion constraint compare foreign keys with ``&&``, which
+    the built-in GiST range operator class supports without btree_gist.
+    """
+
+    function = "int8range"
+    output_field = BigIntegerRangeField()
+
+    def __init__(self, expression):
+        super().__init__(expression, expression, Value("[]"))
+
+
+class ShowTimeRange(Func):
+    """The ``[show_time, show_time + SHOW_TIME_SPACING)`` slot of a session.
+
+    Built from the UTC wall time, as ``timestamptz + interval`` is not
+    immutable and cannot be used in an index.
+    """
+
+    function = "tsrange"
+    output_field = DateTimeRangeField()
+
+    def __init__(self, expression):
+        utc = Func(
+            Value("UTC"),
+            Cast(expression, DateTimeField()),
+            function="timezone",
+            output_field=DateTimeField(),
+        )
+        super().__init__(utc, utc + Value(SHOW_TIME_SPACING))
+
+
 class ShowSession(models.Model):
     astronomy_show = ForeignKey(
         AstronomyShow, on_delete=models.CASCADE, related_name="show_sessions"
@@ -44,32 +106,85 @@ class ShowSession(models.Model):
         null=True,
     )
     show_time = DateTimeField()
+    tickets_sold = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ("-show_time",)
+        indexes = [
+            models.Index(
+                fields=("show_time", "id"), name="show_session_time_idx"
+            ),
+            models.Index(
+                fields=("planetarium_dome", "show_time"),
+                name="show_session_dome_time_idx",
+            ),
+            models.Index(
+                fields=("astronomy_show", "planetarium_dome", "show_time"),
+                name="show_session_conflict_idx",
+            ),
+        ]
+        constraints = [
+            ExclusionConstraint(
+                name=SHOW_TIME_CONFLICT_CONSTRAINT,
+                expressions=[
+                    (PointRange("astronomy_show"), RangeOperators.OVERLAPS),
+                    (PointRange("planetarium_dome"), RangeOperators.OVERLAPS),
+                    (ShowTimeRange("show_time"), RangeOperators.OVERLAPS),
+                ],
+                condition=Q(planetarium_dome__isnull=False),
+                violation_error_message=SHOW_TIME_CONFLICT_MESSAGE,
+            )
+        ]
 
     def __str__(self):
         return self.astronomy_show.title
 
     def clean(self):
         super().clean()
-        qs = ShowSession.objects.all()
-        validate_show_time(
-            show_time=self.show_time,
-            astronomy_show=self.astronomy_show,
-            planetarium_dome=self.planetarium_dome,
-            qs=qs,
-            instance=self,
+        validate_show_time_in_future(self.show_time)
+
+    def save(self, *args, validated=False, **kwargs) -> None:
+        """Validate and save the session.
+
+        Pass ``validated=True`` when the caller has already validated the
+        fields and related objects, e.g. a serializer, to skip ``full_clean``.
+        The spacing rule is left to the exclusion constraint either way, so
+        the write is a single statement and stays correct under concurrent
+        inserts.
+        """
+        if not validated:
+            self.full_clean(validate_constraints=False)
+        using = kwargs.get("using") or router.db_for_write(
+            type(self), instance=self
         )
-
-    def save(self, *args, **kwargs) -> None:
-        self.full_clean()
-        return super().save(*args, **kwargs)
+        # Inside a transaction the failed insert would poison it for the
+        # caller, so isolate it in a savepoint; in autocommit it is needless.
+        savepoint = (
+            transaction.atomic(using=using)
+            if transaction.get_connection(using).in_atomic_block
+            else nullcontext()
+        )
+        try:
+            with savepoint:
+                return super().save(*args, **kwargs)
+        except IntegrityError as error:
+            if is_show_time_conflict(error):
+                raise ValidationError(SHOW_TIME_CONFLICT_MESSAGE)
+            raise
 
     def get_available_seats(self):
-        taken_seats = self.tickets.count()
-        available_seats = self.planetarium_dome.capacity - taken_seats
-        return available_seats
+        # Sessions keep existing when their dome is deleted.
+        if self.planetarium_dome is None:
+            return None
+        return self.planetarium_dome.capacity - self.tickets_sold
+
+    @classmethod
+    def adjust_tickets_sold(cls, show_session_id, delta):
+        """Atomically shift the denormalized ticket counter of a session."""
+        cls.objects.filter(pk=show_session_id).update(
+            tickets_sold=F("tickets_sold") + delta
+        )
+        bump_model_versions_on_commit(cls)
 
     @property
     def show_time_formatted(self):
@@ -102,14 +217,23 @@ class Ticket(models.Model):
         "Reservation",
         on_delete=models.CASCADE,
         related_name="tickets",
+        # Covered by ticket_reservation_session_idx.
+        db_index=False,
     )
 
     class Meta:
         constraints = [
             UniqueConstraint(
-                fields=("show_session", "row", "seat"), name="unique_ticket"
+                fields=("show_session", "row", "seat"),
+                name=UNIQUE_TICKET_CONSTRAINT,
             )
         ]
+        indexes = [
+            models.Index(
+                fields=("reservation", "show_session"),
+                name="ticket_reservation_session_idx",
+            ),
+        ]
         ordering = ("-reservation__created_at",)
 
     def __str__(self):
@@ -130,12 +254,33 @@ class Ticket(models.Model):
         if row > num_rows or row < 0:
             raise ValidationError("Invalid row")
 
+    def get_dome_dimensions(self):
+        """Return ``(rows, seats_in_row)`` of the session's dome in one query.
+
+        Uses the dome when it is already loaded, e.g. through
+        ``select_related``, instead of walking the relations lazily.
+        """
+        if Ticket.show_session.is_cached(self) and (
+            ShowSession.planetarium_dome.is_cached(self.show_session)
+        ):
+            dome = self.show_session.planetarium_dome
+            if dome is not None:
+                return dome.rows, dome.seats_in_row
+
+        return PlanetariumDome.objects.values_list("rows", "seats_in_row").get(
+            show_sessions=self.show_session_id
+        )
+
     def clean(self) -> None:
+        try:
+            rows, seats_in_row = self.get_dome_dimensions()
+        except PlanetariumDome.DoesNotExist:
+            raise ValidationError("Show session has no planetarium dome")
         Ticket.validate_seat_and_row(
             seat=self.seat,
             row=self.row,
-            num_seats=self.show_session.planetarium_dome.seats_in_row,
-            num_rows=self.show_session.planetarium_dome.rows,
+            num_seats=seats_in_row,
+            num_rows=rows,
         )
 
     def save(self, *args, **kwargs) -> None:
@@ -151,6 +296,73 @@ class Reservation(models.Model):
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            # Serves the default ordering and keyset pages of it.
+            models.Index(
+                fields=("created_at", "id"), name="reservation_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} | {self.created_at}"
+
+
+class ShowSessionImportJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        FINISHED = "finished"
+        FAILED = "failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file = models.FileField(upload_to="show_session_imports/")
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        related_name="show_session_import_jobs",
+        null=True,
+    )
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.PENDING
+    )
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    class Meta:
+        ordering = ("-created_at",)
+
+    def __str__(self):
+        return f"{self.id} | {self.status}"
+
+    @property
+    def throughput(self):
+        """Processed rows per second since the job was picked up."""
+        if not self.started_at:
+            return 0
+        elapsed = (self.finished_at or timezone.now()) - self.started_at
+        seconds = max(elapsed.total_seconds(), 1e-3)
+        return round(self.rows_processed / seconds, 2)
+
+    def record_batch(self, rows, errors):
+        """Count a processed batch; return ``False`` if the job stopped.
+
+        The progress is only written while the job is running, so it never
+        overwrites a job that was failed in the meantime.
+        """
+        self.rows_processed += rows
+        self.rows_failed += len(errors)
+        room = settings.SHOW_SESSION_IMPORT_MAX_ERRORS - len(self.errors)
+        self.errors.extend(errors[: max(room, 0)])
+        return bool(
+            type(self)
+            .objects.filter(pk=self.pk, status=self.Status.RUNNING)
+            .update(
+                rows_processed=self.rows_processed,
+                rows_failed=self.rows_failed,
+                errors=self.errors,
+            )
+        )
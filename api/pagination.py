@@ -1,23 +1,318 @@
+import base64
+import binascii
+import json
 from collections import OrderedDict
+from functools import reduce
+from operator import attrgetter, or_
 
-from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimate_row_count(queryset):
+    """Return the planner's row estimate for an unfiltered queryset, or None.
+
+    PostgreSQL keeps ``pg_class.reltuples`` up to date through autovacuum and
+    ANALYZE. The estimate is only used when the queryset cannot have fewer
+    rows than the table and the table is at least
+    ``ESTIMATED_COUNT_THRESHOLD`` rows, where an exact count becomes slow.
+    """
+    query = queryset.query
+    connection = connections[queryset.db]
+    if (
+        connection.vendor != "postgresql"
+        or query.where
+        or query.distinct
+        or query.group_by is not None
+        or query.combinator
+        or query.low_mark
+        or query.high_mark is not None
+    ):
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [connection.ops.quote_name(queryset.model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+
+    if row is None or row[0] < settings.ESTIMATED_COUNT_THRESHOLD:
+        return None
+    return row[0]
+
+
+class EstimatedCountPage(Page):
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that reads the count of large unfiltered tables from stats.
+
+    The estimate only fills in ``count`` and ``pages``. Page bounds come from
+    the rows themselves: each page fetches one row past its size to learn
+    whether there is a next one, so statistics lagging behind the table
+    neither cut off its tail nor leave empty pages at the end.
+    """
+
+    @cached_property
+    def estimate(self):
+        return estimate_row_count(self.object_list)
+
+    @property
+    def count_is_estimated(self):
+        return self.estimate is not None
+
+    @cached_property
+    def count(self):
+        if self.estimate is None:
+            return super().count
+        return self.estimate
+
+    def validate_number(self, number):
+        if not self.count_is_estimated:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        if not self.count_is_estimated:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        return EstimatedCountPage(
+            rows[: self.per_page], number, self, len(rows) > self.per_page
+        )
+
+
+def encode_cursor_value(value):
+    # Full precision, unlike DjangoJSONEncoder, which drops microseconds.
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+class KeysetPagination(BasePagination):
+    """Seek past the last row of the previous page instead of using OFFSET.
+
+    Rows are ordered by the view's ``keyset_ordering`` or, by default, the
+    queryset ordering (``Meta.ordering`` unless overridden) plus the primary
+    key as a tie-breaker, e.g. ``(-show_time, -id)``. The ``cursor`` holds the
+    ordering values of the last row, so every page is an index range scan
+    with no ``COUNT(*)``; the response has no ``count`` or ``pages``.
+    Ordering fields must not be nullable.
+    """
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset, view)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            values = self.decode_cursor(cursor)
+            try:
+                queryset = queryset.filter(self.after(values))
+            except (TypeError, ValueError, ValidationError):
+                # Well-formed JSON whose values do not fit the fields.
+                raise NotFound(self.invalid_cursor_message)
+
+        page = list(queryset[: self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[: self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_ordering(self, queryset, view):
+        ordering = list(
+            getattr(view, "keyset_ordering", None)
+            or queryset.query.order_by
+            or queryset.model._meta.ordering
+        )
+        if not {"pk", "-pk", "id", "-id"} & set(ordering):
+            descending = ordering and ordering[0].startswith("-")
+            ordering.append("-pk" if descending else "pk")
+        return ordering
+
+    def after(self, values):
+        """Rows strictly after ``values`` in the keyset ordering."""
+        conditions = []
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            equal = {
+                previous.lstrip("-"): value
+                for previous, value in zip(self.ordering[:index], values)
+            }
+            conditions.append(
+                Q(**equal, **{f"{name}__{lookup}": values[index]})
+            )
+        return reduce(or_, conditions)
+
+    def encode_cursor(self, instance):
+        values = [
+            attrgetter(field.lstrip("-").replace("__", "."))(instance)
+            for field in self.ordering
+        ]
+        return base64.urlsafe_b64encode(
+            json.dumps(values, default=encode_cursor_value).encode()
+        ).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1]),
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Cursor from the previous page's next link.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
 
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 100
+    mode_query_param = "pagination"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if request.query_params.get(self.mode_query_param) == "keyset":
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        if getattr(view, "estimate_count", False):
+            self.django_paginator_class = EstimatedCountPaginator
+        return super().paginate_queryset(queryset, request, view)
 
     def get_paginated_response(self, data):
+        if self.keyset:
+            return self.keyset.get_paginated_response(data)
+
+        paginator = self.page.paginator
         return Response(
             OrderedDict(
                 [
-                    ("count", self.page.paginator.count),
+                    ("count", paginator.count),
+                    (
+                        "count_is_estimated",
+                        getattr(paginator, "count_is_estimated", False),
+                    ),
                     ("next", self.get_next_link()),
-                    ("pages", self.page.paginator.num_pages),
+                    ("pages", paginator.num_pages),
                     ("previous", self.get_previous_link()),
                     ("results", data),
                 ]
             )
         )
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_is_estimated"] = {
+            "type": "boolean",
+            "description": (
+                "Whether count and pages come from table statistics."
+            ),
+        }
+        response_schema["properties"]["pages"] = {"type": "integer"}
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                "name": self.mode_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Use `keyset` to page with a cursor instead of "
+                "page numbers; the response then has no count or pages.",
+                "schema": {"type": "string", "enum": ["keyset"]},
+            },
+            {
+                "name": KeysetPagination.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": (
+                    "Cursor from the previous keyset page's next link."
+                ),
+                "schema": {"type": "string"},
+            },
+        ]
@@ -0,0 +1,78 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+
+def model_version_key(model):
+    return f"model-version:{model._meta.label_lower}"
+
+
+def get_versions(keys):
+    """Return the version stored under every key, initializing missing ones.
+
+    A missing version starts at the current time in milliseconds, so a
+    counter that was evicted never goes back to a value it already had.
+    """
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns() // 1_000_000, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns() // 1_000_000, None)
+
+
+def get_model_versions(models):
+    return get_versions([model_version_key(model) for model in models])
+
+
+def bump_model_versions(*models):
+    bump_versions(*(model_version_key(model) for model in models))
+
+
+def bump_model_versions_on_commit(*models):
+    transaction.on_commit(lambda: bump_model_versions(*models))
+
+
+class ModelVersionCacheMixin:
+    """Cache ``list`` responses per user, query string and model versions.
+
+    ``cache_models`` lists every model the serialized page depends on.
+    Writing any of them bumps its version, which changes the key, so stale
+    pages are never served and simply expire from the cache.
+    """
+
+    cache_models = ()
+    cache_timeout = None
+
+    def get_list_cache_key(self, request):
+        user = (
+            request.user.pk if request.user.is_authenticated else "anonymous"
+        )
+        versions = ".".join(map(str, get_model_versions(self.cache_models)))
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        digest = hashlib.md5(f"{request.path}?{query}".encode()).hexdigest()
+        return f"list-cache:{self.basename}:{user}:{versions}:{digest}"
+
+    def list(self, request, *args, **kwargs):
+        key = self.get_list_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        timeout = self.cache_timeout or settings.LIST_CACHE_TIMEOUT
+        cache.set(key, response.data, timeout)
+        return response
@@ -9,6 +9,8 @@ from api.serializers.planetarium_serializers import (
     ShowSessionListSerializer,
     PlanetariumDomeSerializer,
     TicketListSerializer,
+    ShowSessionBookingSerializer,
+    SeatHoldSerializer,
 )
 
 
@@ -73,9 +75,68 @@ class ShowSessionSchema:
                 required=False,
                 type={"type": "integer"},
             ),
+            OpenApiParameter(
+                name="show_time_from",
+                description="Sessions starting at or after this date or "
+                "datetime (ex. ?show_time_from=2024-07-01)",
+                required=False,
+                type={"type": "string", "format": "date-time"},
+            ),
+            OpenApiParameter(
+                name="show_time_to",
+                description="Sessions starting before this date or datetime "
+                "(ex. ?show_time_to=2024-07-01T18:00)",
+                required=False,
+                type={"type": "string", "format": "date-time"},
+            ),
+            OpenApiParameter(
+                name="available_seats",
+                description="Only sessions with at least this many seats "
+                "neither sold nor held (ex. ?available_seats=2)",
+                required=False,
+                type={"type": "integer"},
+            ),
         ],
         responses={200: ShowSessionListSerializer(many=True)},
     )
+    seat_map = extend_schema(
+        responses={
+            200: OpenApiResponse(
+                description="Occupied seats as a base64 row-major bitset: "
+                "bit (row - 1) * seats_in_row + (seat - 1) is set, most "
+                "significant bit first"
+            )
+        },
+    )
+    book = extend_schema(
+        request=ShowSessionBookingSerializer,
+        responses={
+            201: OpenApiResponse(
+                description="Reservation and tickets created"
+            ),
+            400: OpenApiResponse(
+                description="Seats outside the planetarium dome"
+            ),
+            409: OpenApiResponse(
+                description="Seats already taken, listed under 'conflicts'"
+            ),
+        },
+    )
+    hold = extend_schema(
+        request=SeatHoldSerializer,
+        responses={
+            201: OpenApiResponse(
+                description="Seats held for the user until 'expires_at'"
+            ),
+            400: OpenApiResponse(
+                description="Seats outside the planetarium dome"
+            ),
+            409: OpenApiResponse(
+                description="Seats sold or held by someone else, listed under "
+                "'conflicts'"
+            ),
+        },
+    )
 
 
 class PlanetariumDomeSchema:
@@ -177,6 +238,16 @@ class ReservationSchema:
 
 class ShowSessionUploadSchema:
     show_session_upload_schema = extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="mode",
+                description="Set to 'async' to import the file in a "
+                "background job and poll upload-show-sessions/<job_id>/ for "
+                "progress. Large files are always imported in a job",
+                required=False,
+                type={"type": "string"},
+            ),
+        ],
         request={
             "multipart/form-data": {
                 "type": "object",
@@ -192,6 +263,7 @@ class ShowSessionUploadSchema:
         },
         responses={
             201: OpenApiResponse(description="Successfully created show sessions"),
+            202: OpenApiResponse(description="Import job queued"),
             400: OpenApiResponse(
                 description="Bad request due to missing or invalid file"
             ),
@@ -0,0 +1,190 @@
+import math
+import time
+from collections import Counter
+from datetime import timedelta
+from functools import cache
+
+import redis
+from django.conf import settings
+from django.utils import timezone
+
+
+@cache
+def get_redis():
+    return redis.Redis.from_url(
+        settings.CACHES["default"]["LOCATION"], decode_responses=True
+    )
+
+
+# Every active hold of every session, scored by its expiry, so that
+# availability across sessions is read with one command.
+HOLD_EXPIRIES_KEY = "seat-holds:expiries"
+# Bumped by every hold and release.
+HOLDS_VERSION_KEY = "seat-holds:version"
+
+
+def seat_holds_key(show_session_id):
+    return f"seat-holds:{show_session_id}"
+
+
+def seat_field(row, seat):
+    return f"{row}:{seat}"
+
+
+def hold_member(show_session_id, row, seat):
+    return f"{show_session_id}:{seat_field(row, seat)}"
+
+
+def parse_hold(value):
+    """Split a ``"<user id>:<expiry timestamp>"`` hash value."""
+    user_id, expires_at = value.split(":")
+    return int(user_id), float(expires_at)
+
+
+def _active_holds(fields, now):
+    holds = {}
+    for field, value in fields.items():
+        user_id, expires_at = parse_hold(value)
+        if expires_at > now:
+            row, seat = map(int, field.split(":"))
+            holds[(row, seat)] = (user_id, expires_at)
+    return holds
+
+
+def hold_seats(user, show_session_id, seats, minutes):
+    """Hold ``(row, seat)`` pairs for ``user`` in the session's hold hash.
+
+    Every session keeps its holds in one Redis hash of ``"row:seat"`` to
+    ``"user id:expiry"``; expired entries are ignored on read and dropped
+    on the next write. The check and the write run as one optimistic
+    transaction, so either every seat is held or none is. Seats already
+    held by the same user get their expiry extended. If any seat is held
+    by someone else, the conflicting seats are returned; otherwise the list
+    is empty. The same transaction records the holds in the expiry index
+    read by ``count_held_seats``.
+    """
+    key = seat_holds_key(show_session_id)
+    expires_at = timezone.now() + timedelta(minutes=minutes)
+
+    with get_redis().pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(key)
+                now = time.time()
+                fields = pipe.hgetall(key)
+                holds = _active_holds(fields, now)
+                conflicts = [
+                    (row, seat)
+                    for row, seat in seats
+                    if holds.get((row, seat), (user.pk,))[0] != user.pk
+                ]
+                if conflicts:
+                    pipe.unwatch()
+                    return None, conflicts
+
+                deadline = now + minutes * 60
+                expired = [
+                    field
+                    for field in fields
+                    if tuple(map(int, field.split(":"))) not in holds
+                ]
+                pipe.multi()
+                if expired:
+                    pipe.hdel(key, *expired)
+                pipe.hset(
+                    key,
+                    mapping={
+                        seat_field(row, seat): f"{user.pk}:{deadline}"
+                        for row, seat in seats
+                    },
+                )
+                latest = max(
+                    [deadline, *(expiry for _, expiry in holds.values())]
+                )
+                pipe.expireat(key, math.ceil(latest))
+                pipe.zadd(
+                    HOLD_EXPIRIES_KEY,
+                    {
+                        hold_member(show_session_id, row, seat): deadline
+                        for row, seat in seats
+                    },
+                )
+                pipe.zremrangebyscore(HOLD_EXPIRIES_KEY, "-inf", now)
+                pipe.incr(HOLDS_VERSION_KEY)
+                pipe.execute()
+                return expires_at, []
+            except redis.WatchError:
+                continue
+
+
+def get_seat_holders(show_session_id, seats):
+    """Map each currently held ``(row, seat)`` of ``seats`` to its holder."""
+    seats = list(seats)
+    if not seats:
+        return {}
+    values = get_redis().hmget(
+        seat_holds_key(show_session_id),
+        [seat_field(row, seat) for row, seat in seats],
+    )
+    now = time.time()
+    holders = {}
+    for (row, seat), value in zip(seats, values):
+        if value is not None:
+            user_id, expires_at = parse_hold(value)
+            if expires_at > now:
+                holders[(row, seat)] = user_id
+    return holders
+
+
+def get_held_seats(show_session):
+    """Return the held seats of a session with a single HGETALL."""
+    fields = get_redis().hgetall(seat_holds_key(show_session.pk))
+    return {
+        seat: user_id
+        for seat, (user_id, _) in _active_holds(fields, time.time()).items()
+    }
+
+
+def count_held_seats():
+    """Map every session with active holds to its number of held seats."""
+    members = get_redis().zrangebyscore(
+        HOLD_EXPIRIES_KEY, f"({time.time()}", "+inf"
+    )
+    return Counter(int(member.split(":", 1)[0]) for member in members)
+
+
+def get_holds_state():
+    """Return a value that changes whenever any session's holds change.
+
+    That is the version bumped by every hold and release, plus the next
+    hold to expire, which moves on as soon as it does.
+    """
+    with get_redis().pipeline(transaction=False) as pipe:
+        pipe.get(HOLDS_VERSION_KEY)
+        pipe.zrangebyscore(
+            HOLD_EXPIRIES_KEY,
+            f"({time.time()}",
+            "+inf",
+            start=0,
+            num=1,
+            withscores=True,
+        )
+        return tuple(pipe.execute())
+
+
+def release_seat_holds(show_session_id, seats):
+    if seats:
+        with get_redis().pipeline() as pipe:
+            pipe.hdel(
+                seat_holds_key(show_session_id),
+                *(seat_field(row, seat) for row, seat in seats),
+            )
+            pipe.zrem(
+                HOLD_EXPIRIES_KEY,
+                *(
+                    hold_member(show_session_id, row, seat)
+                    for row, seat in seats
+                ),
+            )
+            pipe.incr(HOLDS_VERSION_KEY)
+            pipe.execute()
@@ -0,0 +1,83 @@
+import base64
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from api.models import Ticket
+from api.response_cache import bump_versions, get_versions
+from api.seat_holds import get_held_seats
+
+
+def seat_map_version_key(show_session_id):
+    return f"seat-map-version:{show_session_id}"
+
+
+def seat_map_cache_key(show_session_id, version):
+    return f"seat-map:{show_session_id}:{version}"
+
+
+def pack_seats(seats, rows, seats_in_row):
+    """Pack 1-based (row, seat) pairs into a base64 row-major bitset.
+
+    Bit ``(row - 1) * seats_in_row + (seat - 1)`` is set for every pair,
+    most significant bit first, as produced by ``numpy.packbits``.
+    """
+    bitmap = np.zeros(rows * seats_in_row, dtype=bool)
+    seats = np.array(list(seats), dtype=np.int64).reshape(-1, 2)
+    in_bounds = (
+        (seats[:, 0] >= 1)
+        & (seats[:, 0] <= rows)
+        & (seats[:, 1] >= 1)
+        & (seats[:, 1] <= seats_in_row)
+    )
+    seats = seats[in_bounds]
+    bitmap[(seats[:, 0] - 1) * seats_in_row + seats[:, 1] - 1] = True
+    return base64.b64encode(np.packbits(bitmap).tobytes()).decode("ascii")
+
+
+def build_seat_map(show_session):
+    dome = show_session.planetarium_dome
+    rows, seats_in_row = (dome.rows, dome.seats_in_row) if dome else (0, 0)
+    occupied = Ticket.objects.filter(show_session=show_session).values_list(
+        "row", "seat"
+    )
+    return {
+        "show_session": show_session.pk,
+        "rows": rows,
+        "seats_in_row": seats_in_row,
+        "occupied": pack_seats(occupied, rows, seats_in_row),
+    }
+
+
+def get_seat_map(show_session):
+    """Return the occupied seats, cached, and the currently held ones.
+
+    The occupied bitset is cached under a per-session version, which every
+    ticket write bumps on commit, and rebuilt if it is missing or the dome
+    changed. The version is read before the tickets, so a rebuild racing
+    with a booking is stored under the old version and never served.
+    Holds expire on their own, so they are read fresh on every call.
+    """
+    (version,) = get_versions([seat_map_version_key(show_session.pk)])
+    key = seat_map_cache_key(show_session.pk, version)
+    seat_map = cache.get(key)
+    dome = show_session.planetarium_dome
+    if (
+        seat_map is None
+        or dome is None
+        or (seat_map["rows"], seat_map["seats_in_row"])
+        != (dome.rows, dome.seats_in_row)
+    ):
+        seat_map = build_seat_map(show_session)
+        cache.set(key, seat_map, settings.SEAT_MAP_CACHE_TIMEOUT)
+
+    held = get_held_seats(show_session)
+    return {
+        **seat_map,
+        "held": pack_seats(held, seat_map["rows"], seat_map["seats_in_row"]),
+    }
+
+
+def invalidate_seat_map(show_session_id):
+    bump_versions(seat_map_version_key(show_session_id))
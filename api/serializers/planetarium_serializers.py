@@ -1,6 +1,11 @@
 from rest_framework import serializers
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
+from django.utils.encoding import smart_str
 
+from api.booking import create_reservation
 from api.models import (
     ShowTheme,
     AstronomyShow,
@@ -8,8 +13,37 @@ from api.models import (
     PlanetariumDome,
     Ticket,
     Reservation,
+    ShowSessionImportJob,
 )
-from api.validators import validate_show_time
+from api.seat_holds import get_held_seats
+from api.telegram_links import issue_telegram_link
+from api.validators import validate_show_time_in_future
+
+User = get_user_model()
+
+
+class PrefetchedSlugRelatedField(serializers.SlugRelatedField):
+    """Resolve slugs from a mapping in the serializer context.
+
+    The mapping is built once per batch by the caller, so validating a row
+    does not query the database.
+    """
+
+    def __init__(self, context_key, **kwargs):
+        self.context_key = context_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        try:
+            return self.context[self.context_key][data]
+        except KeyError:
+            self.fail(
+                "does_not_exist",
+                slug_name=self.slug_field,
+                value=smart_str(data),
+            )
+        except TypeError:
+            self.fail("invalid")
 
 
 class ShowThemeSerializer(serializers.ModelSerializer):
@@ -39,7 +73,20 @@ class ReservationSerializer(serializers.ModelSerializer):
         )
 
 
+class ReservationTicketSerializer(serializers.Serializer):
+    id = serializers.IntegerField(read_only=True)
+    show_session = serializers.IntegerField(
+        source="show_session_id", min_value=1
+    )
+    row = serializers.IntegerField(min_value=1)
+    seat = serializers.IntegerField(min_value=1)
+
+
 class ReservationCreateSerializer(serializers.ModelSerializer):
+    user = serializers.PrimaryKeyRelatedField(
+        queryset=User.objects.all(), default=serializers.CurrentUserDefault()
+    )
+    tickets = ReservationTicketSerializer(many=True, allow_empty=False)
 
     class Meta:
         model = Reservation
@@ -47,11 +94,29 @@ class ReservationCreateSerializer(serializers.ModelSerializer):
             "id",
             "user",
             "created_at",
+            "tickets",
         )
 
-    def get_tickets(self, obj):
-        tickets = obj.tickets.all()
-        return [ticket.show_session.astronomy_show.title for ticket in tickets]
+    def validate_tickets(self, tickets):
+        seats = [
+            (ticket["show_session_id"], ticket["row"], ticket["seat"])
+            for ticket in tickets
+        ]
+        if len(set(seats)) != len(seats):
+            raise serializers.ValidationError(
+                "Each seat can only be booked once."
+            )
+        return seats
+
+    def create(self, validated_data):
+        try:
+            reservation, _ = create_reservation(
+                user=validated_data["user"], tickets=validated_data["tickets"]
+            )
+        except ShowSession.DoesNotExist as error:
+            raise serializers.ValidationError({"tickets": [str(error)]})
+
+        return reservation
 
 
 class AstronomyShowSerializer(serializers.ModelSerializer):
@@ -130,25 +195,73 @@ class ShowSessionSerializer(serializers.ModelSerializer):
         )
 
     def validate(self, attrs):
-        show_time = attrs.get("show_time")
-        astronomy_show = attrs.get("astronomy_show")
-        planetarium_dome = attrs.get("planetarium_dome")
-        qs = ShowSession.objects.all()
-
-        validate_show_time(
-            show_time=show_time,
-            astronomy_show=astronomy_show,
-            planetarium_dome=planetarium_dome,
-            qs=qs,
-            instance=self.instance,
+        # A partial update may leave the show time as it is.
+        if "show_time" in attrs:
+            validate_show_time_in_future(attrs["show_time"])
+        return attrs
+
+    def create(self, validated_data):
+        instance = ShowSession(**validated_data)
+        instance.save(validated=True)
+        return instance
+
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(validated=True)
+        return instance
+
+    def save(self, **kwargs):
+        # The spacing rule is checked by the database when the row is written.
+        try:
+            return super().save(**kwargs)
+        except DjangoValidationError as error:
+            raise serializers.ValidationError(
+                serializers.as_serializer_error(error)
+            )
+
+
+class ShowSessionImportSerializer(serializers.ModelSerializer):
+    """Validate a single CSV row of a show session upload.
+
+    Related objects come from the ``astronomy_shows`` and ``planetarium_domes``
+    context mappings; the one-hour spacing rule is checked by the importer
+    for the whole batch at once.
+    """
+
+    astronomy_show = PrefetchedSlugRelatedField(
+        context_key="astronomy_shows",
+        slug_field="title",
+        queryset=AstronomyShow.objects.all(),
+    )
+    planetarium_dome = PrefetchedSlugRelatedField(
+        context_key="planetarium_domes",
+        slug_field="name",
+        queryset=PlanetariumDome.objects.all(),
+    )
+
+    class Meta:
+        model = ShowSession
+        fields = (
+            "id",
+            "astronomy_show",
+            "planetarium_dome",
+            "show_time",
         )
 
+    def validate(self, attrs):
+        validate_show_time_in_future(attrs.get("show_time"))
         return attrs
 
 
 class ShowSessionListSerializer(serializers.ModelSerializer):
     astronomy_show = serializers.CharField(source="astronomy_show.title")
-    planetarium_dome = serializers.CharField(source="planetarium_dome.name")
+    # Sessions keep existing when their dome is deleted.
+    planetarium_dome = serializers.CharField(
+        source="planetarium_dome.name", allow_null=True
+    )
+    capacity = serializers.IntegerField(read_only=True)
+    available_seats = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = ShowSession
@@ -157,15 +270,24 @@ class ShowSessionListSerializer(serializers.ModelSerializer):
             "astronomy_show",
             "planetarium_dome",
             "show_time_formatted",
+            "capacity",
+            "available_seats",
         )
 
 
 class ShowSessionRetrieveSerializer(serializers.ModelSerializer):
     astronomy_show = serializers.CharField(source="astronomy_show.title")
-    show_theme = serializers.CharField(source="astronomy_show.show_theme")
+    show_theme = serializers.SlugRelatedField(
+        source="astronomy_show.show_theme",
+        slug_field="name",
+        read_only=True,
+        many=True,
+    )
     description = serializers.CharField(source="astronomy_show.description")
-    planetarium_dome = serializers.CharField(source="planetarium_dome.name")
-    available_seats = serializers.CharField(source="get_available_seats")
+    planetarium_dome = serializers.CharField(
+        source="planetarium_dome.name", allow_null=True
+    )
+    available_seats = serializers.SerializerMethodField()
 
     class Meta:
         model = ShowSession
@@ -179,11 +301,16 @@ class ShowSessionRetrieveSerializer(serializers.ModelSerializer):
             "available_seats",
         )
 
+    def get_available_seats(self, obj) -> int | None:
+        available_seats = obj.get_available_seats()
+        if available_seats is None:
+            return None
+        return available_seats - len(get_held_seats(obj))
+
 
 class TicketSerializer(serializers.ModelSerializer):
     show_session_title = serializers.CharField(write_only=True)
     show_session_time = serializers.DateTimeField(write_only=True)
-    reservation = serializers.BooleanField(write_only=True, allow_null=True)
     show_session = serializers.SerializerMethodField()
 
     class Meta:
@@ -194,7 +321,6 @@ class TicketSerializer(serializers.ModelSerializer):
             "show_session_time",
             "row",
             "seat",
-            "reservation",
             "show_session",
         )
 
@@ -229,20 +355,52 @@ class TicketSerializer(serializers.ModelSerializer):
         return show_session_serializer.data
 
     def create(self, validated_data):
-        validated_data.pop("show_session_title")
-        validated_data.pop("show_session_time")
+        _, tickets = create_reservation(
+            user=self.context["request"].user,
+            tickets=[
+                (
+                    validated_data["show_session"].pk,
+                    validated_data["row"],
+                    validated_data["seat"],
+                )
+            ],
+        )
+        return tickets[0]
 
-        reservation_flag = validated_data.pop("reservation", False)
-        show_session = validated_data.pop("show_session")
 
-        with transaction.atomic():
-            ticket = Ticket.objects.create(show_session=show_session, **validated_data)
+class SeatSerializer(serializers.Serializer):
+    row = serializers.IntegerField(min_value=1)
+    seat = serializers.IntegerField(min_value=1)
+
+
+class ShowSessionBookingSerializer(serializers.Serializer):
+    seats = SeatSerializer(many=True, allow_empty=False)
+
+    def validate_seats(self, seats):
+        pairs = [(seat["row"], seat["seat"]) for seat in seats]
+        if len(set(pairs)) != len(pairs):
+            raise serializers.ValidationError(
+                "Each seat can only be booked once."
+            )
+        return pairs
+
+
+class SeatHoldSerializer(ShowSessionBookingSerializer):
+    minutes = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.SEAT_HOLD_MAX_MINUTES,
+        default=settings.SEAT_HOLD_MINUTES,
+    )
 
-            if reservation_flag:
-                user = self.context["request"].user
-                Reservation.objects.create(user=user)
 
-        return ticket
+class BookedTicketSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Ticket
+        fields = (
+            "id",
+            "row",
+            "seat",
+        )
 
 
 class TicketListSerializer(serializers.ModelSerializer):
@@ -279,3 +437,28 @@ class TicketRetrieveSerializer(serializers.ModelSerializer):
             "reservation",
             "show_time",
         )
+
+
+class ShowSessionImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ShowSessionImportJob
+        fields = (
+            "id",
+            "status",
+            "rows_processed",
+            "rows_failed",
+            "throughput",
+            "errors",
+            "created_at",
+            "started_at",
+            "finished_at",
+        )
+
+
+class TelegramLinkSerializer(serializers.Serializer):
+    code = serializers.CharField(read_only=True)
+    link = serializers.URLField(read_only=True, allow_null=True)
+    expires_in = serializers.IntegerField(read_only=True)
+
+    def create(self, validated_data):
+        return issue_telegram_link(self.context["request"].user)
@@ -0,0 +1,136 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from api.events import publish_event, tickets_booked_event
+from api.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    ShowTheme,
+    Ticket,
+)
+from api.response_cache import bump_model_versions_on_commit
+from api.seat_map import invalidate_seat_map
+from api.ticket_lookup import invalidate_tickets_by_email
+
+
+@receiver(pre_save, sender=Ticket)
+def remember_previous_show_session(
+    sender, instance, raw, update_fields, **kwargs
+):
+    # A ticket moved to another session must be taken off the old one.
+    instance._previous_show_session_id = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and "show_session" not in update_fields:
+        return
+    previous = (
+        Ticket.objects.filter(pk=instance.pk)
+        .values_list("show_session_id", flat=True)
+        .first()
+    )
+    if previous != instance.show_session_id:
+        instance._previous_show_session_id = previous
+
+
+@receiver(post_save, sender=Ticket)
+def increment_tickets_sold(sender, instance, created, **kwargs):
+    if created:
+        ShowSession.adjust_tickets_sold(instance.show_session_id, 1)
+    elif getattr(instance, "_previous_show_session_id", None) is not None:
+        ShowSession.adjust_tickets_sold(instance._previous_show_session_id, -1)
+        ShowSession.adjust_tickets_sold(instance.show_session_id, 1)
+
+
+@receiver(post_delete, sender=Ticket)
+def decrement_tickets_sold(sender, instance, **kwargs):
+    ShowSession.adjust_tickets_sold(instance.show_session_id, -1)
+
+
+def publish_single_ticket_booked(ticket):
+    """Publish the event of one ticket, loading only what is not cached."""
+    prefetch_related_objects(
+        [ticket],
+        "show_session__astronomy_show",
+        "show_session__planetarium_dome",
+    )
+    email = owner_email(ticket)
+    if email is not None:
+        publish_event(
+            tickets_booked_event(email, ticket.reservation_id, [ticket])
+        )
+
+
+@receiver(post_save, sender=Ticket)
+def publish_ticket_booked(sender, instance, created, **kwargs):
+    # Tickets saved one by one, e.g. in the admin; bookings through the API
+    # are bulk-created and publish their own event. Built after the commit,
+    # so the request transaction runs no queries for it.
+    if created:
+        transaction.on_commit(partial(publish_single_ticket_booked, instance))
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def drop_cached_seat_map(sender, instance, **kwargs):
+    show_session_ids = {
+        instance.show_session_id,
+        getattr(instance, "_previous_show_session_id", None),
+    } - {None}
+    for show_session_id in show_session_ids:
+        transaction.on_commit(partial(invalidate_seat_map, show_session_id))
+
+
+def owner_email(instance):
+    """Email of the owner of a reservation or ticket, in one query at most."""
+    users = get_user_model().objects.values_list("email", flat=True)
+    if isinstance(instance, Ticket):
+        if not Ticket.reservation.is_cached(instance):
+            return users.filter(reservations=instance.reservation_id).first()
+        instance = instance.reservation
+    if Reservation.user.is_cached(instance):
+        return instance.user.email
+    return users.filter(pk=instance.user_id).first()
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def drop_cached_tickets_by_email(sender, instance, **kwargs):
+    email = owner_email(instance)
+    if email is not None:
+        transaction.on_commit(lambda: invalidate_tickets_by_email(email))
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+@receiver(post_save, sender=ShowSession)
+@receiver(post_delete, sender=ShowSession)
+@receiver(post_save, sender=AstronomyShow)
+@receiver(post_delete, sender=AstronomyShow)
+@receiver(post_save, sender=ShowTheme)
+@receiver(post_delete, sender=ShowTheme)
+@receiver(post_save, sender=PlanetariumDome)
+@receiver(post_delete, sender=PlanetariumDome)
+def bump_cached_model_version(sender, **kwargs):
+    bump_model_versions_on_commit(sender)
+
+
+@receiver(m2m_changed, sender=AstronomyShow.show_theme.through)
+def bump_astronomy_show_version(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_model_versions_on_commit(AstronomyShow)
@@ -0,0 +1,30 @@
+import secrets
+
+from django.conf import settings
+
+from api.seat_holds import get_redis
+
+
+def telegram_link_key(code):
+    # Read and deleted by the bot when the chat sends "/start <code>".
+    return f"planetarium:telegram-link:{code}"
+
+
+def issue_telegram_link(user):
+    """Issue a one-time code that links a Telegram chat to ``user``'s email.
+
+    The code proves that the chat belongs to the user: it is only handed out
+    to the authenticated user and works once, within
+    ``TELEGRAM_LINK_CODE_TTL`` seconds. With ``TELEGRAM_BOT_USERNAME`` set,
+    the response also has the ``https://t.me/<bot>?start=<code>`` deep link
+    that sends the code to the bot in one tap.
+    """
+    code = secrets.token_urlsafe(16)
+    ttl = settings.TELEGRAM_LINK_CODE_TTL
+    get_redis().set(telegram_link_key(code), user.email, ex=ttl)
+    username = settings.TELEGRAM_BOT_USERNAME
+    return {
+        "code": code,
+        "link": f"https://t.me/{username}?start={code}" if username else None,
+        "expires_in": ttl,
+    }
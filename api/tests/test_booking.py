@@ -0,0 +1,375 @@
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.booking import _sold_seats as sold_seats
+from api.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    Ticket,
+)
+from api.seat_holds import get_held_seats
+
+API_SHOW_SESSION_BOOK = "api:show-session-book"
+API_SHOW_SESSION_HOLD = "api:show-session-hold"
+API_SHOW_SESSION_DETAIL = "api:show-session-detail"
+API_SHOW_SESSION = "api:show-session-list"
+API_RESERVATION = "api:reservation-list"
+API_TICKET = "api:ticket-list"
+API_TICKETS_BY_EMAIL = "api:get_tickets_by_email"
+
+
+def seats(*pairs):
+    return {"seats": [{"row": row, "seat": seat} for row, seat in pairs]}
+
+
+class ShowSessionBookingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com", password="password"
+        )
+        self.client.force_authenticate(self.user)
+        self.show_session = ShowSession.objects.create(
+            astronomy_show=AstronomyShow.objects.create(
+                title="Mars", description="Red"
+            ),
+            planetarium_dome=PlanetariumDome.objects.create(
+                name="Main", rows=5, seats_in_row=10
+            ),
+            show_time=datetime.now() + timedelta(days=1),
+        )
+        self.url = reverse(API_SHOW_SESSION_BOOK, args=[self.show_session.pk])
+
+    def test_book_creates_reservation_with_all_tickets(self):
+        response = self.client.post(
+            self.url, seats((1, 1), (1, 2), (2, 5)), format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["tickets"]), 3)
+        reservation = Reservation.objects.get(user=self.user)
+        self.assertEqual(reservation.tickets.count(), 3)
+        self.show_session.refresh_from_db()
+        self.assertEqual(self.show_session.tickets_sold, 3)
+
+    def test_book_reports_every_conflicting_seat(self):
+        self.client.post(self.url, seats((1, 1), (1, 2)), format="json")
+
+        response = self.client.post(
+            self.url, seats((1, 1), (1, 2), (1, 3)), format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            response.data["conflicts"],
+            [
+                {"show_session": self.show_session.pk, "row": 1, "seat": 1},
+                {"show_session": self.show_session.pk, "row": 1, "seat": 2},
+            ],
+        )
+        self.assertEqual(Ticket.objects.count(), 2)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_book_rejects_seats_outside_the_dome(self):
+        response = self.client.post(
+            self.url, seats((1, 1), (6, 1), (1, 11)), format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data["seats"]), 2)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_book_rejects_duplicate_seats(self):
+        response = self.client.post(self.url, seats((1, 1), (1, 1)), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_book_rejects_started_sessions(self):
+        ShowSession.objects.filter(pk=self.show_session.pk).update(
+            show_time=datetime.now() - timedelta(minutes=5)
+        )
+
+        response = self.client.post(self.url, seats((1, 1)), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("show_session", response.data)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_book_reports_seats_taken_without_the_session_lock(self):
+        Ticket.objects.create(
+            row=1,
+            seat=1,
+            show_session=self.show_session,
+            reservation=Reservation.objects.create(user=self.user),
+        )
+        calls = []
+
+        def sold_seats_missing_the_race(*args):
+            # The first check runs before the concurrent write commits.
+            calls.append(args)
+            return [] if len(calls) == 1 else sold_seats(*args)
+
+        with mock.patch("api.booking._sold_seats", sold_seats_missing_the_race):
+            response = self.client.post(
+                self.url, seats((1, 1), (1, 2)), format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            response.data["conflicts"],
+            [{"show_session": self.show_session.pk, "row": 1, "seat": 1}],
+        )
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_book_requires_authentication(self):
+        response = APIClient().post(self.url, seats((1, 1)), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ReservationCreateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@test.com", password="password"
+        )
+        self.client.force_authenticate(self.user)
+        show = AstronomyShow.objects.create(title="Mars", description="Red")
+        dome = PlanetariumDome.objects.create(name="Main", rows=5, seats_in_row=10)
+        self.show_time = (datetime.now() + timedelta(days=1)).replace(microsecond=0)
+        self.first_session = ShowSession.objects.create(
+            astronomy_show=show, planetarium_dome=dome, show_time=self.show_time
+        )
+        self.second_session = ShowSession.objects.create(
+            astronomy_show=show,
+            planetarium_dome=dome,
+            show_time=self.show_time + timedelta(hours=3),
+        )
+
+    def test_create_reservation_with_nested_tickets(self):
+        response = self.client.post(
+            reverse(API_RESERVATION),
+            {
+                "tickets": [
+                    {"show_session": self.first_session.pk, "row": 1, "seat": 1},
+                    {"show_session": self.first_session.pk, "row": 1, "seat": 2},
+                    {"show_session": self.second_session.pk, "row": 3, "seat": 4},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["user"], self.user.pk)
+        self.assertEqual(len(response.data["tickets"]), 3)
+        reservation = Reservation.objects.get()
+        self.assertEqual(reservation.tickets.count(), 3)
+        self.first_session.refresh_from_db()
+        self.assertEqual(self.first_session.tickets_sold, 2)
+
+    def test_create_reservation_with_unknown_session(self):
+        response = self.client.post(
+            reverse(API_RESERVATION),
+            {"tickets": [{"show_session": 0, "row": 1, "seat": 1}]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_ticket_create_links_reservation(self):
+        response = self.client.post(
+            reverse(API_TICKET),
+            {
+                "show_session_title": "Mars",
+                "show_session_time": self.show_time.isoformat(),
+                "row": 2,
+                "seat": 3,
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        ticket = Ticket.objects.get()
+        self.assertEqual(ticket.reservation.user, self.user)
+
+    def tickets_by_email(self, email="admin@test.com", **params):
+        return self.client.post(
+            reverse(API_TICKETS_BY_EMAIL), {"email": email, **params}
+        )
+
+    def book(self, show_session, *pairs):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse(API_SHOW_SESSION_BOOK, args=[show_session.pk]),
+                seats(*pairs),
+                format="json",
+            )
+
+    def test_tickets_by_email_follows_reservations(self):
+        other = get_user_model().objects.create_user(
+            email="other@test.com", password="password"
+        )
+        self.book(self.first_session, (1, 1))
+        self.client.force_authenticate(other)
+        self.book(self.first_session, (1, 2))
+
+        with self.assertNumQueries(1):
+            response = self.tickets_by_email()
+
+        self.assertEqual(
+            response.json()["data"],
+            [
+                {
+                    "row": 1,
+                    "seat": 1,
+                    "title": "Mars",
+                    "show_time": self.show_time.isoformat(),
+                    "dome": "Main",
+                }
+            ],
+        )
+
+    def test_tickets_by_email_pages(self):
+        self.book(self.first_session, (1, 1), (1, 2), (2, 1))
+        self.book(self.second_session, (3, 3))
+
+        first = self.tickets_by_email(page_size=3).json()
+        second = self.tickets_by_email(page_size=3, page=2).json()
+
+        self.assertEqual(first["next_page"], 2)
+        self.assertEqual(
+            [(ticket["row"], ticket["seat"]) for ticket in first["data"]],
+            [(3, 3), (1, 1), (1, 2)],
+        )
+        self.assertIsNone(second["next_page"])
+        self.assertEqual(
+            [(ticket["row"], ticket["seat"]) for ticket in second["data"]], [(2, 1)]
+        )
+        self.assertEqual(
+            self.tickets_by_email(page=0).status_code, status.HTTP_400_BAD_REQUEST
+        )
+
+    def test_tickets_by_email_cache_is_dropped_on_booking(self):
+        self.book(self.first_session, (1, 1))
+        self.tickets_by_email()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.tickets_by_email().json()["data"]), 1)
+
+        self.book(self.second_session, (2, 2))
+        self.assertEqual(len(self.tickets_by_email().json()["data"]), 2)
+
+    def test_tickets_by_email_unknown_user(self):
+        response = self.tickets_by_email(email="nobody@test.com")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json()["message"], "User not found")
+
+
+class SeatHoldTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com", password="password"
+        )
+        self.other = get_user_model().objects.create_user(
+            email="other@test.com", password="password"
+        )
+        self.client.force_authenticate(self.user)
+        self.show_session = ShowSession.objects.create(
+            astronomy_show=AstronomyShow.objects.create(
+                title="Mars", description="Red"
+            ),
+            planetarium_dome=PlanetariumDome.objects.create(
+                name="Main", rows=5, seats_in_row=10
+            ),
+            show_time=datetime.now() + timedelta(days=1),
+        )
+        self.hold_url = reverse(API_SHOW_SESSION_HOLD, args=[self.show_session.pk])
+        self.book_url = reverse(API_SHOW_SESSION_BOOK, args=[self.show_session.pk])
+
+    def test_held_seats_cannot_be_held_or_booked_by_others(self):
+        response = self.client.post(self.hold_url, seats((1, 1), (1, 2)), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.client.force_authenticate(self.other)
+        response = self.client.post(self.hold_url, seats((1, 2), (1, 3)), format="json")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        response = self.client.post(self.book_url, seats((1, 1)), format="json")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        response = self.client.post(self.hold_url, seats((1, 3)), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_booking_consumes_own_holds(self):
+        self.client.post(self.hold_url, seats((1, 1), (1, 2)), format="json")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.book_url, seats((1, 1)), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(get_held_seats(self.show_session), {(1, 2): self.user.pk})
+
+    def test_expired_holds_are_released(self):
+        self.client.post(self.hold_url, seats((1, 1)), format="json")
+
+        with mock.patch("api.seat_holds.time.time", return_value=time.time() + 3600):
+            self.assertEqual(get_held_seats(self.show_session), {})
+            self.client.force_authenticate(self.other)
+            response = self.client.post(self.hold_url, seats((1, 1)), format="json")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(
+                get_held_seats(self.show_session), {(1, 1): self.other.pk}
+            )
+
+    def test_holds_reduce_availability(self):
+        self.client.post(self.hold_url, seats((2, 1), (2, 2)), format="json")
+
+        response = self.client.get(
+            reverse(API_SHOW_SESSION_DETAIL, args=[self.show_session.pk])
+        )
+
+        self.assertEqual(response.data["available_seats"], 48)
+
+    def test_holds_reduce_availability_in_the_list(self):
+        self.client.post(self.hold_url, seats((2, 1), (2, 2)), format="json")
+        url = reverse(API_SHOW_SESSION)
+
+        response = self.client.get(url)
+        self.assertEqual(response.data["results"][0]["available_seats"], 48)
+        response = self.client.get(url, {"available_seats": 49})
+        self.assertEqual(response.data["results"], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.book_url, seats((2, 1)), format="json")
+        response = self.client.get(url, {"available_seats": 48})
+        self.assertEqual(response.data["results"][0]["available_seats"], 48)
+
+    def test_holds_change_the_list_etag(self):
+        url = reverse(API_SHOW_SESSION)
+        etag = self.client.get(url)["ETag"]
+
+        self.client.post(self.hold_url, seats((1, 1)), format="json")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with mock.patch("api.seat_holds.time.time", return_value=time.time() + 3600):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["available_seats"], 50)
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    ShowTheme,
+    Ticket,
+)
+
+API_ASTRONOMY_SHOW = "api:astronomy-show-list"
+API_ASTRONOMY_SHOW_DETAIL = "api:astronomy-show-detail"
+API_SHOW_SESSION = "api:show-session-list"
+API_PLANETARIUM_DOME = "api:planetarium-dome-list"
+API_TICKET = "api:ticket-list"
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com", password="password"
+        )
+        self.client.force_authenticate(self.user)
+        self.theme = ShowTheme.objects.create(name="Planets")
+        self.show = AstronomyShow.objects.create(title="Mars", description="Red")
+        self.show.show_theme.add(self.theme)
+        self.dome = PlanetariumDome.objects.create(name="Main", rows=5, seats_in_row=10)
+        self.show_session = ShowSession.objects.create(
+            astronomy_show=self.show,
+            planetarium_dome=self.dome,
+            show_time=datetime.now() + timedelta(days=1),
+        )
+
+    def get(self, url, etag=None, **params):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(url, params, **headers)
+
+    def test_unchanged_list_is_not_modified(self):
+        url = reverse(API_ASTRONOMY_SHOW)
+        response = self.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            response = self.get(url, etag=response["ETag"])
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(response.content)
+
+    def test_unchanged_detail_is_not_modified(self):
+        url = reverse(API_ASTRONOMY_SHOW_DETAIL, args=[self.show.pk])
+        etag = self.get(url)["ETag"]
+
+        response = self.get(url, etag=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_writes_change_the_etag(self):
+        url = reverse(API_ASTRONOMY_SHOW)
+        etag = self.get(url)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.show.show_theme.add(ShowTheme.objects.create(name="Stars"))
+        response = self.get(url, etag=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.theme.astronomy_shows.clear()
+        etag = response["ETag"]
+        response = self.get(url, etag=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.show.delete()
+        self.assertEqual(self.get(url, etag=response["ETag"]).status_code, 200)
+
+    def test_related_rows_change_the_etag(self):
+        url = reverse(API_SHOW_SESSION)
+        etag = self.get(url)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dome.name = "Small"
+            self.dome.save()
+
+        self.assertEqual(self.get(url, etag=etag).status_code, 200)
+
+    def test_deleted_dome_changes_the_session_etag(self):
+        url = reverse(API_SHOW_SESSION)
+        etag = self.get(url)["ETag"]
+
+        # The sessions are set to NULL without a save of their own.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dome.delete()
+
+        response = self.get(url, etag=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["results"][0]["planetarium_dome"])
+
+    def test_renamed_show_changes_the_ticket_etag(self):
+        Ticket.objects.create(
+            row=1,
+            seat=1,
+            show_session=self.show_session,
+            reservation=Reservation.objects.create(user=self.user),
+        )
+        url = reverse(API_TICKET)
+        etag = self.get(url)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.show.title = "Venus"
+            self.show.save()
+
+        self.assertEqual(self.get(url, etag=etag).status_code, 200)
+
+    def test_etag_depends_on_query_string(self):
+        url = reverse(API_PLANETARIUM_DOME)
+
+        self.assertNotEqual(self.get(url)["ETag"], self.get(url, name="Main")["ETag"])
@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.models import PlanetariumDome, Reservation
+
+API_RESERVATION = "api:reservation-list"
+API_PLANETARIUM_DOME = "api:planetarium-dome-list"
+
+
+@override_settings(ESTIMATED_COUNT_THRESHOLD=10)
+class EstimatedCountTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@test.com", password="password"
+        )
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com", password="password"
+        )
+        Reservation.objects.bulk_create(
+            [Reservation(user=self.admin) for _ in range(25)]
+            + [Reservation(user=self.user) for _ in range(5)]
+        )
+        PlanetariumDome.objects.bulk_create(
+            [
+                PlanetariumDome(name=f"Dome {index}", rows=5, seats_in_row=5)
+                for index in range(30)
+            ]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE api_reservation")
+            cursor.execute("ANALYZE api_planetariumdome")
+
+    def test_unfiltered_listing_uses_table_statistics(self):
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.get(reverse(API_RESERVATION))
+
+        self.assertTrue(response.data["count_is_estimated"])
+        self.assertEqual(response.data["count"], 30)
+        self.assertEqual(response.data["pages"], 3)
+
+    def test_filtered_listing_is_counted_exactly(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(reverse(API_RESERVATION))
+
+        self.assertFalse(response.data["count_is_estimated"])
+        self.assertEqual(response.data["count"], 5)
+
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=100)
+    def test_small_table_is_counted_exactly(self):
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.get(reverse(API_RESERVATION))
+
+        self.assertFalse(response.data["count_is_estimated"])
+
+    def test_viewsets_without_estimates_count_exactly(self):
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.get(reverse(API_PLANETARIUM_DOME))
+
+        self.assertFalse(response.data["count_is_estimated"])
+
+    def test_rows_past_the_estimate_stay_reachable(self):
+        Reservation.objects.bulk_create(
+            [Reservation(user=self.admin) for _ in range(15)]
+        )
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.get(reverse(API_RESERVATION), {"page": 4})
+        self.assertIsNotNone(response.data["next"])
+
+        response = self.client.get(reverse(API_RESERVATION), {"page": 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 5)
+        self.assertIsNone(response.data["next"])
+        self.assertEqual(response.data["count"], 30)
+
+    def test_estimate_above_the_row_count_ends_on_the_last_row(self):
+        Reservation.objects.filter(
+            pk__in=Reservation.objects.filter(user=self.admin)[:12]
+        ).delete()
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.get(reverse(API_RESERVATION), {"page": 2})
+        self.assertEqual(len(response.data["results"]), 8)
+        self.assertIsNone(response.data["next"])
+        self.assertEqual(response.data["count"], 30)
+
+        response = self.client.get(reverse(API_RESERVATION), {"page": 3})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
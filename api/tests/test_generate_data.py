@@ -0,0 +1,54 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase
+
+from api.models import AstronomyShow, PlanetariumDome, ShowSession, Ticket
+from api.validators import SHOW_TIME_SPACING
+
+
+class GenerateDataTests(TestCase):
+    def generate(self, **options):
+        call_command("generate_data", scale=0.002, seed=1, stdout=StringIO(), **options)
+
+    def assert_consistent(self):
+        self.assertFalse(
+            ShowSession.objects.annotate(count=Count("tickets"))
+            .exclude(tickets_sold=F("count"))
+            .exists()
+        )
+        self.assertFalse(
+            Ticket.objects.filter(
+                row__gt=F("show_session__planetarium_dome__rows")
+            ).exists()
+        )
+        for dome_id in PlanetariumDome.objects.values_list("pk", flat=True):
+            times = list(
+                ShowSession.objects.filter(planetarium_dome_id=dome_id)
+                .order_by("show_time")
+                .values_list("show_time", flat=True)
+            )
+            gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+            self.assertTrue(all(gap >= SHOW_TIME_SPACING for gap in gaps))
+
+    def test_generates_scaled_consistent_data(self):
+        self.generate()
+
+        self.assertEqual(ShowSession.objects.count(), 200)
+        self.assert_consistent()
+
+    def test_copy_appends_to_existing_data(self):
+        self.generate()
+        self.generate(copy=True)
+
+        self.assertEqual(ShowSession.objects.count(), 400)
+        self.assert_consistent()
+        self.assertTrue(
+            ShowSession.objects.create(
+                astronomy_show=AstronomyShow.objects.first(),
+                planetarium_dome=PlanetariumDome.objects.first(),
+                show_time=ShowSession.objects.latest("show_time").show_time
+                + SHOW_TIME_SPACING,
+            ).pk
+        )
@@ -0,0 +1,131 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import generics, status
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from api.models import AstronomyShow, PlanetariumDome, Reservation, ShowSession
+from api.pagination import KeysetPagination
+from api.serializers.planetarium_serializers import ReservationSerializer
+
+API_SHOW_SESSION = "api:show-session-list"
+
+
+class ReservationKeysetView(generics.ListAPIView):
+    queryset = Reservation.objects.select_related("user")
+    serializer_class = ReservationSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ("created_at", "id")
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com", password="password"
+        )
+        self.client.force_authenticate(self.user)
+        show = AstronomyShow.objects.create(title="Mars", description="Red")
+        domes = [
+            PlanetariumDome.objects.create(name=f"Dome {index}", rows=5, seats_in_row=5)
+            for index in range(3)
+        ]
+        start = datetime.now() + timedelta(days=1)
+        # Sessions share show times across domes, so the id tie-breaker matters.
+        ShowSession.objects.bulk_create(
+            [
+                ShowSession(
+                    astronomy_show=show,
+                    planetarium_dome=dome,
+                    show_time=start + timedelta(hours=hour),
+                )
+                for hour in range(5)
+                for dome in domes
+            ]
+        )
+
+    def walk(self, url, params):
+        ids = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            self.assertFalse(
+                any("COUNT(" in query["sql"] for query in queries),
+                "keyset pages must not count rows",
+            )
+            ids += [result["id"] for result in response.data["results"]]
+            url, params = response.data["next"], {}
+        return ids
+
+    def test_keyset_pages_follow_the_default_ordering(self):
+        expected = list(
+            ShowSession.objects.order_by("-show_time", "-id").values_list(
+                "id", flat=True
+            )
+        )
+
+        ids = self.walk(
+            reverse(API_SHOW_SESSION), {"pagination": "keyset", "page_size": 4}
+        )
+
+        self.assertEqual(ids, expected)
+
+    def test_keyset_respects_filters(self):
+        ids = self.walk(
+            reverse(API_SHOW_SESSION),
+            {"pagination": "keyset", "page_size": 2, "planetarium_dome": "Dome 1"},
+        )
+
+        self.assertEqual(len(ids), 5)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            reverse(API_SHOW_SESSION), {"pagination": "keyset", "cursor": "nope"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_values_of_the_wrong_type(self):
+        for values in (["abc", 1], [None, "x"], [{}, []]):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode())
+            response = self.client.get(
+                reverse(API_SHOW_SESSION),
+                {"pagination": "keyset", "cursor": cursor.decode()},
+            )
+
+            self.assertEqual(
+                response.status_code, status.HTTP_404_NOT_FOUND, values
+            )
+
+    def test_viewset_level_keyset_ordering(self):
+        for _ in range(5):
+            Reservation.objects.create(user=self.user)
+        view = ReservationKeysetView.as_view()
+        factory = APIRequestFactory()
+
+        ids = []
+        params = {"page_size": 2}
+        url = "/reservations/"
+        while url:
+            request = factory.get(url, params)
+            force_authenticate(request, self.user)
+            response = view(request)
+            ids += [result["id"] for result in response.data["results"]]
+            url, params = response.data["next"], {}
+
+        self.assertEqual(
+            ids,
+            list(
+                Reservation.objects.order_by("created_at", "id").values_list(
+                    "id", flat=True
+                )
+            ),
+        )
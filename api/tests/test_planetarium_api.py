@@ -1,11 +1,16 @@
 from datetime import datetime, timedelta
+from unittest import mock
 
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.urls import reverse
 
 from api.models import ShowTheme, PlanetariumDome, AstronomyShow, ShowSession
+from api.validators import SHOW_TIME_CONFLICT_MESSAGE
 
 API_SHOW_THEME = "api:show-theme-list"
 API_SHOW_SESSION = "api:show-session-list"
@@ -99,6 +104,108 @@ class PlanetariumDomeTests(TestCase):
         self.assertEqual(planetarium_dome.capacity, 100)
 
 
+class ShowSessionTests(TestCase):
+
+    def setUp(self):
+        self.show_session = sample_show_session()
+
+    def sample_next_session(self, hours):
+        return ShowSession.objects.create(
+            astronomy_show=self.show_session.astronomy_show,
+            planetarium_dome=self.show_session.planetarium_dome,
+            show_time=self.show_session.show_time + timedelta(hours=hours),
+        )
+
+    def test_show_times_an_hour_apart(self):
+        self.sample_next_session(hours=1)
+        self.sample_next_session(hours=-1)
+        self.assertEqual(ShowSession.objects.count(), 3)
+
+    def test_show_time_conflict(self):
+        for hours in (0, 0.5, -0.5):
+            with self.subTest(hours=hours):
+                with self.assertRaisesMessage(
+                    ValidationError, SHOW_TIME_CONFLICT_MESSAGE
+                ):
+                    self.sample_next_session(hours=hours)
+        self.assertEqual(ShowSession.objects.count(), 1)
+
+    def admin_client(self):
+        client = APIClient()
+        client.force_authenticate(
+            get_user_model().objects.create_superuser(
+                email="admin@test.com", password="password"
+            )
+        )
+        return client
+
+    def test_create_is_not_validated_twice(self):
+        client = self.admin_client()
+
+        # The show and dome lookups, then the insert. The test case runs in
+        # a transaction, so the insert also gets a SAVEPOINT and a RELEASE.
+        with self.assertNumQueries(5):
+            response = client.post(
+                reverse(API_SHOW_SESSION),
+                {
+                    "astronomy_show": self.show_session.astronomy_show.title,
+                    "planetarium_dome": self.show_session.planetarium_dome.name,
+                    "show_time": self.show_session.show_time + timedelta(hours=1),
+                },
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_partial_update_without_show_time(self):
+        dome = sample_planetarium_dome(name="Other Planetarium")
+
+        response = self.admin_client().patch(
+            reverse(
+                "api:show-session-detail", args=[self.show_session.id]
+            ),
+            {"planetarium_dome": dome.name},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.show_session.refresh_from_db()
+        self.assertEqual(self.show_session.planetarium_dome, dome)
+
+    def test_create_show_time_conflict(self):
+        response = self.admin_client().post(
+            reverse(API_SHOW_SESSION),
+            {
+                "astronomy_show": self.show_session.astronomy_show.title,
+                "planetarium_dome": self.show_session.planetarium_dome.name,
+                "show_time": self.show_session.show_time + timedelta(minutes=30),
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data, {"non_field_errors": [SHOW_TIME_CONFLICT_MESSAGE]}
+        )
+
+
+class ShowSessionAutocommitTests(TransactionTestCase):
+    def test_conflict_outside_a_transaction_needs_no_savepoint(self):
+        show_session = sample_show_session()
+
+        with mock.patch.object(
+            transaction, "atomic", wraps=transaction.atomic
+        ) as atomic:
+            with self.assertRaisesMessage(
+                ValidationError, SHOW_TIME_CONFLICT_MESSAGE
+            ):
+                ShowSession.objects.create(
+                    astronomy_show=show_session.astronomy_show,
+                    planetarium_dome=show_session.planetarium_dome,
+                    show_time=show_session.show_time,
+                )
+
+        atomic.assert_not_called()
+        self.assertEqual(ShowSession.objects.count(), 1)
+
+
 class UnauthorizedAccessTests(TestCase):
     def setUp(self):
         self.client = APIClient()
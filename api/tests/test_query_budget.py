@@ -0,0 +1,227 @@
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    ShowTheme,
+    Ticket,
+)
+from api.urls.planetarium_urls import router
+
+PAGE_SIZES = (1, 10, 100)
+SMALL, LARGE = 5, 150
+START = datetime.now() + timedelta(days=1)
+
+
+def generate(size, offset=0):
+    """Create ``size`` rows per model, each show with two themes and a ticket."""
+    numbers = range(offset, offset + size)
+    themes = ShowTheme.objects.bulk_create(
+        [ShowTheme(name=f"Theme {number}") for number in numbers]
+    )
+    shows = AstronomyShow.objects.bulk_create(
+        [AstronomyShow(title=f"Show {number}", description="Sky") for number in numbers]
+    )
+    through = AstronomyShow.show_theme.through
+    through.objects.bulk_create(
+        [
+            through(astronomyshow_id=show.pk, showtheme_id=theme.pk)
+            for show, theme in zip(shows, themes)
+        ]
+        + [
+            through(astronomyshow_id=show.pk, showtheme_id=themes[0].pk)
+            for show in shows[1:]
+        ]
+    )
+    domes = PlanetariumDome.objects.bulk_create(
+        [
+            PlanetariumDome(name=f"Dome {number}", rows=10, seats_in_row=10)
+            for number in numbers
+        ]
+    )
+    sessions = ShowSession.objects.bulk_create(
+        [
+            ShowSession(
+                astronomy_show=show,
+                planetarium_dome=dome,
+                show_time=START + timedelta(hours=number),
+            )
+            for number, show, dome in zip(numbers, shows, domes)
+        ]
+    )
+    users = get_user_model().objects.bulk_create(
+        [get_user_model()(email=f"user{number}@test.com") for number in numbers]
+    )
+    reservations = Reservation.objects.bulk_create(
+        [Reservation(user=user) for user in users]
+    )
+    Ticket.objects.bulk_create(
+        [
+            Ticket(row=1, seat=1, show_session=session, reservation=reservation)
+            for session, reservation in zip(sessions, reservations)
+        ]
+    )
+
+
+def create_payload(basename, number):
+    show_session = ShowSession.objects.select_related(
+        "astronomy_show", "planetarium_dome"
+    ).first()
+    payloads = {
+        "show-theme": {"name": f"New theme {number}"},
+        "astronomy-show": {
+            "title": f"New show {number}",
+            "description": "Sky",
+            "show_theme": [{"name": "Theme 0"}],
+        },
+        "show-session": {
+            "astronomy_show": "Show 0",
+            "planetarium_dome": "Dome 0",
+            "show_time": (START - timedelta(hours=number + 2)).isoformat(),
+        },
+        "planetarium-dome": {
+            "name": f"New dome {number}",
+            "rows": 10,
+            "seats_in_row": 10,
+        },
+        "ticket": {
+            "show_session_title": show_session.astronomy_show.title,
+            "show_session_time": show_session.show_time.isoformat(),
+            "row": 2,
+            "seat": number % 10 + 1,
+        },
+        "reservation": {
+            "tickets": [
+                {"show_session": show_session.pk, "row": 3, "seat": number % 10 + 1}
+            ]
+        },
+    }
+    return payloads[basename]
+
+
+class QueryBudgetTests(TestCase):
+    """Every router endpoint must run a constant number of queries.
+
+    Each endpoint is measured on a small and a large dataset and, for lists,
+    with every page size; all measurements of one endpoint must agree.
+    Set ``QUERY_BUDGET_REPORT=1`` to get a table of the measurements on
+    stderr once the class has run.
+    """
+
+    report = []
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser(
+            email="admin@test.com", password="password"
+        )
+        generate(SMALL)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if not os.environ.get("QUERY_BUDGET_REPORT"):
+            return
+        lines = [
+            "{:<18} {:<9} {:>5} {:>9} {:>8} {:>9}".format(
+                "endpoint", "action", "rows", "page_size", "queries", "ms"
+            )
+        ]
+        lines += [
+            "{:<18} {:<9} {:>5} {:>9} {:>8} {:>9.1f}".format(*row)
+            for row in sorted(cls.report)
+        ]
+        sys.stderr.write("\n" + "\n".join(lines) + "\n")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def measure(self, basename, action, rows, page_size, request):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = request()
+            elapsed = (time.perf_counter() - started) * 1000
+        self.assertLess(response.status_code, 300, response.data)
+        self.report.append((basename, action, rows, page_size, len(queries), elapsed))
+        return len(queries)
+
+    def assertConstant(self, counts):
+        for basename, measured in counts.items():
+            with self.subTest(endpoint=basename):
+                self.assertEqual(len(set(measured)), 1, measured)
+
+    def measure_lists(self, rows, counts):
+        for _, _, basename in router.registry:
+            for page_size in PAGE_SIZES:
+                counts.setdefault(basename, []).append(
+                    self.measure(
+                        basename,
+                        "list",
+                        rows,
+                        page_size,
+                        lambda: self.client.get(
+                            reverse(f"api:{basename}-list"), {"page_size": page_size}
+                        ),
+                    )
+                )
+
+    def measure_retrieves(self, rows, counts):
+        for _, viewset, basename in router.registry:
+            pk = viewset.queryset.model.objects.order_by("pk").values("pk")[0]["pk"]
+            counts.setdefault(basename, []).append(
+                self.measure(
+                    basename,
+                    "retrieve",
+                    rows,
+                    "-",
+                    lambda: self.client.get(
+                        reverse(f"api:{basename}-detail", args=[pk])
+                    ),
+                )
+            )
+
+    def measure_creates(self, rows, counts):
+        for _, _, basename in router.registry:
+            payload = create_payload(basename, len(counts.get(basename, ())))
+            counts.setdefault(basename, []).append(
+                self.measure(
+                    basename,
+                    "create",
+                    rows,
+                    "-",
+                    lambda: self.client.post(
+                        reverse(f"api:{basename}-list"), payload, format="json"
+                    ),
+                )
+            )
+
+    def run_budget(self, measure):
+        counts = {}
+        measure(SMALL, counts)
+        generate(LARGE - SMALL, offset=SMALL)
+        measure(LARGE, counts)
+        self.assertConstant(counts)
+
+    def test_list_query_budget(self):
+        self.run_budget(self.measure_lists)
+
+    def test_retrieve_query_budget(self):
+        self.run_budget(self.measure_retrieves)
+
+    def test_create_query_budget(self):
+        self.run_budget(self.measure_creates)
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.models import AstronomyShow, PlanetariumDome, ShowSession
+
+API_TICKET = "api:ticket-list"
+API_SHOW_SESSION_BOOK = "api:show-session-book"
+
+
+class TicketListCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com", password="password"
+        )
+        self.other = get_user_model().objects.create_user(
+            email="other@test.com", password="password"
+        )
+        self.client.force_authenticate(self.user)
+        self.show = AstronomyShow.objects.create(title="Mars", description="Red")
+        self.show_session = ShowSession.objects.create(
+            astronomy_show=self.show,
+            planetarium_dome=PlanetariumDome.objects.create(
+                name="Main", rows=5, seats_in_row=10
+            ),
+            show_time=datetime.now() + timedelta(days=1),
+        )
+
+    def book(self, row, seat):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse(API_SHOW_SESSION_BOOK, args=[self.show_session.pk]),
+                {"seats": [{"row": row, "seat": seat}]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_list_is_served_from_cache(self):
+        self.book(1, 1)
+        self.client.get(reverse(API_TICKET))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse(API_TICKET))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+
+    def test_booking_invalidates_cached_list(self):
+        self.client.get(reverse(API_TICKET))
+
+        self.book(1, 1)
+        response = self.client.get(reverse(API_TICKET))
+
+        self.assertEqual(response.data["count"], 1)
+
+    def test_renamed_show_invalidates_cached_list(self):
+        self.book(1, 1)
+        self.client.get(reverse(API_TICKET))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.show.title = "Venus"
+            self.show.save()
+        response = self.client.get(reverse(API_TICKET))
+
+        self.assertEqual(response.data["results"][0]["show_session"], "Venus")
+
+    def test_cache_is_per_user_and_query(self):
+        self.client.get(reverse(API_TICKET))
+        self.client.force_authenticate(self.other)
+
+        with self.assertNumQueries(2):
+            self.client.get(reverse(API_TICKET))
+
+        with self.assertNumQueries(1):
+            self.client.get(reverse(API_TICKET), {"title": "Mars"})
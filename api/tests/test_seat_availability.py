@@ -0,0 +1,233 @@
+import base64
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    Ticket,
+)
+from api.seat_map import build_seat_map
+
+API_SHOW_SESSION = "api:show-session-list"
+API_SHOW_SESSION_SEAT_MAP = "api:show-session-seat-map"
+
+
+class TicketsSoldCounterTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com", password="password"
+        )
+        self.reservation = Reservation.objects.create(user=self.user)
+        self.show_session = ShowSession.objects.create(
+            astronomy_show=AstronomyShow.objects.create(
+                title="Mars", description="Red"
+            ),
+            planetarium_dome=PlanetariumDome.objects.create(
+                name="Main", rows=10, seats_in_row=10
+            ),
+            show_time=datetime.now() + timedelta(days=1),
+        )
+
+    def create_ticket(self, row=1, seat=1):
+        return Ticket.objects.create(
+            row=row,
+            seat=seat,
+            show_session=self.show_session,
+            reservation=self.reservation,
+        )
+
+    def test_counter_follows_ticket_writes(self):
+        ticket = self.create_ticket(seat=1)
+        self.create_ticket(seat=2)
+        self.show_session.refresh_from_db()
+        self.assertEqual(self.show_session.tickets_sold, 2)
+        self.assertEqual(self.show_session.get_available_seats(), 98)
+
+        ticket.delete()
+        self.show_session.refresh_from_db()
+        self.assertEqual(self.show_session.tickets_sold, 1)
+
+    def test_counter_follows_ticket_moved_to_another_session(self):
+        other_session = ShowSession.objects.create(
+            astronomy_show=self.show_session.astronomy_show,
+            planetarium_dome=self.show_session.planetarium_dome,
+            show_time=self.show_session.show_time + timedelta(hours=2),
+        )
+        ticket = self.create_ticket()
+
+        ticket.show_session = other_session
+        ticket.save()
+        ticket.row = 2
+        ticket.save()
+
+        self.show_session.refresh_from_db()
+        other_session.refresh_from_db()
+        self.assertEqual(self.show_session.tickets_sold, 0)
+        self.assertEqual(other_session.tickets_sold, 1)
+
+    def test_available_seats_does_not_count_tickets(self):
+        self.create_ticket()
+        show_session = ShowSession.objects.select_related("planetarium_dome").get()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(show_session.get_available_seats(), 99)
+
+    def test_reconcile_command_fixes_drift(self):
+        self.create_ticket()
+        ShowSession.objects.update(tickets_sold=7)
+
+        call_command("reconcile_tickets_sold", stdout=StringIO())
+
+        self.show_session.refresh_from_db()
+        self.assertEqual(self.show_session.tickets_sold, 1)
+
+
+class ShowSessionAvailabilityListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com", password="password"
+        )
+        self.client.force_authenticate(self.user)
+        show = AstronomyShow.objects.create(title="Mars", description="Red")
+        dome = PlanetariumDome.objects.create(name="Main", rows=2, seats_in_row=5)
+        reservation = Reservation.objects.create(user=self.user)
+        for day in range(1, 4):
+            show_session = ShowSession.objects.create(
+                astronomy_show=show,
+                planetarium_dome=dome,
+                show_time=datetime.now() + timedelta(days=day),
+            )
+            for index in range(day * 4 - 2):
+                Ticket.objects.create(
+                    row=index // 5 + 1,
+                    seat=index % 5 + 1,
+                    show_session=show_session,
+                    reservation=reservation,
+                )
+
+    def test_list_includes_availability(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse(API_SHOW_SESSION))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual([result["capacity"] for result in results], [10] * 3)
+        self.assertEqual([result["available_seats"] for result in results], [0, 4, 8])
+
+    def test_filter_by_available_seats(self):
+        response = self.client.get(reverse(API_SHOW_SESSION), {"available_seats": 4})
+
+        self.assertEqual(
+            [result["available_seats"] for result in response.data["results"]],
+            [4, 8],
+        )
+
+    def test_invalid_available_seats_filter(self):
+        response = self.client.get(
+            reverse(API_SHOW_SESSION), {"available_seats": "many"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_session_without_dome(self):
+        show_session = ShowSession.objects.first()
+        PlanetariumDome.objects.all().delete()
+
+        response = self.client.get(
+            reverse("api:show-session-detail", args=[show_session.pk])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["planetarium_dome"])
+        self.assertIsNone(response.data["available_seats"])
+
+
+def unpack_seat_map(seat_map):
+    bits = np.unpackbits(
+        np.frombuffer(base64.b64decode(seat_map["occupied"]), dtype=np.uint8)
+    )
+    size = seat_map["rows"] * seat_map["seats_in_row"]
+    return bits[:size].reshape(seat_map["rows"], seat_map["seats_in_row"])
+
+
+class SeatMapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com", password="password"
+        )
+        self.client.force_authenticate(self.user)
+        self.reservation = Reservation.objects.create(user=self.user)
+        self.show_session = ShowSession.objects.create(
+            astronomy_show=AstronomyShow.objects.create(
+                title="Mars", description="Red"
+            ),
+            planetarium_dome=PlanetariumDome.objects.create(
+                name="Main", rows=50, seats_in_row=20
+            ),
+            show_time=datetime.now() + timedelta(days=1),
+        )
+        self.url = reverse(API_SHOW_SESSION_SEAT_MAP, args=[self.show_session.pk])
+
+    def book(self, row, seat):
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.create(
+                row=row,
+                seat=seat,
+                show_session=self.show_session,
+                reservation=self.reservation,
+            )
+
+    def test_seat_map_is_a_compact_bitset(self):
+        self.book(1, 1)
+        self.book(50, 20)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(base64.b64decode(response.data["occupied"])), 125)
+        seats = unpack_seat_map(response.data)
+        self.assertEqual(seats.sum(), 2)
+        self.assertTrue(seats[0, 0])
+        self.assertTrue(seats[49, 19])
+
+    def test_seat_map_is_cached_until_tickets_change(self):
+        self.client.get(self.url)
+
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+        self.book(2, 3)
+        response = self.client.get(self.url)
+        self.assertTrue(unpack_seat_map(response.data)[1, 2])
+
+    def test_rebuild_racing_with_a_booking_is_not_served(self):
+        def build_then_book(show_session):
+            seat_map = build_seat_map(show_session)
+            self.book(2, 3)
+            return seat_map
+
+        with mock.patch(
+            "api.seat_map.build_seat_map", side_effect=build_then_book
+        ):
+            response = self.client.get(self.url)
+        self.assertFalse(unpack_seat_map(response.data)[1, 2])
+
+        response = self.client.get(self.url)
+        self.assertTrue(unpack_seat_map(response.data)[1, 2])
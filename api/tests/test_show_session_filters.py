@@ -0,0 +1,113 @@
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.models import AstronomyShow, PlanetariumDome, ShowSession
+
+API_SHOW_SESSION = "api:show-session-list"
+
+SHOW_TIMES = (
+    datetime(2030, 12, 31, 22, 30),
+    datetime(2031, 1, 1, 0, 0),
+    datetime(2031, 1, 15, 10, 0),
+    datetime(2031, 1, 15, 11, 0),
+    datetime(2032, 1, 15, 10, 0),
+)
+
+
+class ShowTimeFilterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="user@test.com", password="password"
+            )
+        )
+        show = AstronomyShow.objects.create(title="Mars", description="Red")
+        dome = PlanetariumDome.objects.create(name="Main", rows=5, seats_in_row=10)
+        ShowSession.objects.bulk_create(
+            [
+                ShowSession(
+                    astronomy_show=show, planetarium_dome=dome, show_time=show_time
+                )
+                for show_time in SHOW_TIMES
+            ]
+        )
+
+    def show_times(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(API_SHOW_SESSION), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.sql = " ".join(query["sql"] for query in queries)
+        return sorted(
+            result["show_time_formatted"] for result in response.data["results"]
+        )
+
+    def test_date_parts_become_a_range(self):
+        self.assertEqual(len(self.show_times(show_time_year=2031)), 3)
+        self.assertNotIn("EXTRACT", self.sql)
+        self.assertEqual(
+            self.show_times(show_time_year=2030, show_time_month=12),
+            ["2030-12-31 22:30"],
+        )
+        self.assertEqual(
+            self.show_times(
+                show_time_year=2031,
+                show_time_month=1,
+                show_time_day=15,
+                show_time_hour=10,
+            ),
+            ["2031-01-15 10:00"],
+        )
+        self.assertNotIn("EXTRACT", self.sql)
+
+    def test_parts_after_a_gap_still_filter(self):
+        self.assertEqual(
+            self.show_times(show_time_day=15, show_time_hour=10),
+            ["2031-01-15 10:00", "2032-01-15 10:00"],
+        )
+        self.assertEqual(
+            self.show_times(show_time_year=2031, show_time_hour=11),
+            ["2031-01-15 11:00"],
+        )
+
+    def test_impossible_date_is_empty(self):
+        self.assertEqual(self.show_times(show_time_year=2031, show_time_month=13), [])
+
+    def test_zero_month_or_day_is_empty(self):
+        self.assertEqual(
+            self.show_times(
+                show_time_year=2031, show_time_month=0, show_time_day=15
+            ),
+            [],
+        )
+        self.assertEqual(
+            self.show_times(
+                show_time_year=2031, show_time_month=1, show_time_day=0
+            ),
+            [],
+        )
+
+    def test_show_time_from_and_to(self):
+        self.assertEqual(
+            self.show_times(
+                show_time_from="2031-01-01", show_time_to="2031-01-15T11:00"
+            ),
+            ["2031-01-01 00:00", "2031-01-15 10:00"],
+        )
+
+    def test_invalid_values(self):
+        for params in (
+            {"show_time_year": "last"},
+            {"show_time_from": "yesterday"},
+            {"show_time_to": "2031-02-30"},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(reverse(API_SHOW_SESSION), params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
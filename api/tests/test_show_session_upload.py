@@ -0,0 +1,300 @@
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.importers import ShowSessionImporter, batched, iter_lines
+from api.jobs import (
+    STALE_JOB_MESSAGE,
+    get_job_queue,
+    process_import_job,
+    run_worker,
+)
+from api.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    ShowSession,
+    ShowSessionImportJob,
+)
+from api.validators import SHOW_TIME_CONFLICT_MESSAGE
+
+API_UPLOAD_SHOW_SESSION = "api:upload-show-sessions"
+API_UPLOAD_SHOW_SESSION_JOB = "api:upload-show-sessions-job"
+
+
+def csv_upload(*rows):
+    lines = ["astronomy_show,planetarium_dome,show_time"]
+    lines += [",".join(row) for row in rows]
+    return SimpleUploadedFile(
+        "sessions.csv", "\n".join(lines).encode("utf-8"), content_type="text/csv"
+    )
+
+
+def show_time(hours):
+    start = (datetime.now() + timedelta(days=1)).replace(microsecond=0)
+    return (start + timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class IterLinesTests(TestCase):
+    def test_lines_are_reassembled_across_chunks(self):
+        data = "title,dome\r\nÉtoile,Main\nMars,Dôme".encode("utf-8")
+        chunks = [data[i : i + 3] for i in range(0, len(data), 3)]
+
+        self.assertEqual(
+            list(iter_lines(chunks)),
+            ["title,dome\r\n", "Étoile,Main\n", "Mars,Dôme"],
+        )
+
+
+class ShowSessionUploadTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@test.com", password="password"
+        )
+        self.client.force_authenticate(self.user)
+        self.show = AstronomyShow.objects.create(title="Mars", description="Red")
+        self.dome = PlanetariumDome.objects.create(
+            name="Main", rows=10, seats_in_row=10
+        )
+
+    def upload(self, *rows):
+        return self.client.post(
+            reverse(API_UPLOAD_SHOW_SESSION),
+            {"file": csv_upload(*rows)},
+            format="multipart",
+        )
+
+    def test_upload_creates_sessions(self):
+        response = self.upload(
+            ("Mars", "Main", show_time(0)),
+            ("Mars", "Main", show_time(2)),
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [session["show_time"] for session in response.data["created_sessions"]],
+            [show_time(0).replace(" ", "T"), show_time(2).replace(" ", "T")],
+        )
+        self.assertEqual(ShowSession.objects.count(), 2)
+
+    def test_import_checks_spacing_across_batches(self):
+        rows = [
+            {"astronomy_show": "Mars", "planetarium_dome": "Main", "show_time": time}
+            for time in (show_time(0), show_time(2), show_time(2.5))
+        ]
+
+        created, errors = ShowSessionImporter(batch_size=1).run(rows)
+
+        self.assertEqual(len(created), 2)
+        self.assertEqual(errors, [{"non_field_errors": [SHOW_TIME_CONFLICT_MESSAGE]}])
+
+    def test_upload_rejects_conflicts_with_later_sessions(self):
+        ShowSession.objects.create(
+            astronomy_show=self.show,
+            planetarium_dome=self.dome,
+            show_time=datetime.strptime(show_time(1), "%Y-%m-%d %H:%M:%S"),
+        )
+
+        response = self.upload(
+            ("Mars", "Main", show_time(0)),
+            ("Mars", "Main", show_time(0.5)),
+        )
+
+        self.assertEqual(
+            response.data["errors"],
+            [{"non_field_errors": [SHOW_TIME_CONFLICT_MESSAGE]}],
+        )
+        self.assertEqual(ShowSession.objects.count(), 2)
+
+    def test_upload_rejects_sessions_of_a_parallel_import(self):
+        ShowSession.objects.create(
+            astronomy_show=self.show,
+            planetarium_dome=self.dome,
+            show_time=datetime.strptime(show_time(0), "%Y-%m-%d %H:%M:%S"),
+        )
+
+        # The existing session is invisible to the in-memory check, as if it
+        # was committed after the batch was validated.
+        with mock.patch("api.importers.ShowSessionImporter._load_existing"):
+            response = self.upload(
+                ("Mars", "Main", show_time(0.5)),
+                ("Mars", "Main", show_time(2)),
+            )
+
+        self.assertEqual(
+            response.data["errors"],
+            [{"non_field_errors": [SHOW_TIME_CONFLICT_MESSAGE]}],
+        )
+        self.assertEqual(ShowSession.objects.count(), 2)
+
+    def test_upload_query_count_does_not_grow_with_rows(self):
+        rows = [("Mars", "Main", show_time(hours * 2)) for hours in range(50)]
+
+        with self.assertNumQueries(8):
+            response = self.upload(*rows)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(ShowSession.objects.count(), 50)
+
+    def test_upload_rejects_non_utf8_file(self):
+        csv_file = SimpleUploadedFile(
+            "sessions.csv", "astronomy_show\nÉtoile".encode("latin-1")
+        )
+
+        response = self.client.post(
+            reverse(API_UPLOAD_SHOW_SESSION), {"file": csv_file}, format="multipart"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_reports_errors_per_row(self):
+        response = self.upload(
+            ("Venus", "Main", show_time(0)),
+            ("Mars", "Main", "tomorrow"),
+            ("Mars", "Main", show_time(0)),
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data["errors"]
+        self.assertEqual(len(errors), 2)
+        self.assertIn("astronomy_show", errors[0])
+        self.assertIn("show_time", errors[1])
+        self.assertEqual(ShowSession.objects.count(), 1)
+
+    def test_upload_rejects_conflicts_in_file_and_database(self):
+        ShowSession.objects.create(
+            astronomy_show=self.show,
+            planetarium_dome=self.dome,
+            show_time=datetime.strptime(show_time(0), "%Y-%m-%d %H:%M:%S"),
+        )
+
+        response = self.upload(
+            ("Mars", "Main", show_time(0.5)),
+            ("Mars", "Main", show_time(3)),
+            ("Mars", "Main", show_time(3.5)),
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["errors"],
+            [{"non_field_errors": [SHOW_TIME_CONFLICT_MESSAGE]}] * 2,
+        )
+        self.assertEqual(ShowSession.objects.count(), 2)
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(),
+    SHOW_SESSION_IMPORT_QUEUE={"BACKEND": "api.jobs.LocalJobQueue"},
+)
+class ShowSessionImportJobTests(TestCase):
+    def setUp(self):
+        get_job_queue.cache_clear()
+        self.addCleanup(get_job_queue.cache_clear)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@test.com", password="password"
+        )
+        self.client.force_authenticate(self.user)
+        AstronomyShow.objects.create(title="Mars", description="Red")
+        PlanetariumDome.objects.create(name="Main", rows=10, seats_in_row=10)
+
+    def test_async_upload_is_processed_by_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse(API_UPLOAD_SHOW_SESSION) + "?mode=async",
+                {
+                    "file": csv_upload(
+                        ("Mars", "Main", show_time(0)),
+                        ("Mars", "Main", show_time(0.5)),
+                        ("Mars", "Main", show_time(2)),
+                    )
+                },
+                format="multipart",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], ShowSessionImportJob.Status.PENDING)
+        self.assertEqual(ShowSession.objects.count(), 0)
+
+        run_worker(get_job_queue(), burst=True)
+
+        response = self.client.get(
+            reverse(API_UPLOAD_SHOW_SESSION_JOB, args=[response.data["id"]])
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], ShowSessionImportJob.Status.FINISHED)
+        self.assertEqual(response.data["rows_processed"], 3)
+        self.assertEqual(response.data["rows_failed"], 1)
+        self.assertEqual(len(response.data["errors"]), 1)
+        self.assertEqual(ShowSession.objects.count(), 2)
+
+    @override_settings(SHOW_SESSION_UPLOAD_SYNC_MAX_SIZE=64)
+    def test_large_upload_is_queued(self):
+        rows = [("Mars", "Main", show_time(hours * 2)) for hours in range(5)]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse(API_UPLOAD_SHOW_SESSION),
+                {"file": csv_upload(*rows)},
+                format="multipart",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(ShowSession.objects.count(), 0)
+
+        run_worker(get_job_queue(), burst=True)
+
+        self.assertEqual(ShowSession.objects.count(), 5)
+
+    def test_worker_fails_jobs_abandoned_while_running(self):
+        job = ShowSessionImportJob.objects.create(
+            file=csv_upload(("Mars", "Main", show_time(0))),
+            status=ShowSessionImportJob.Status.RUNNING,
+            started_at=timezone.now() - timedelta(hours=2),
+        )
+        recent = ShowSessionImportJob.objects.create(
+            file=csv_upload(("Mars", "Main", show_time(2))),
+            status=ShowSessionImportJob.Status.RUNNING,
+            started_at=timezone.now(),
+        )
+
+        with self.assertLogs("api.jobs", "WARNING"):
+            run_worker(get_job_queue(), burst=True)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ShowSessionImportJob.Status.FAILED)
+        self.assertEqual(job.errors, [STALE_JOB_MESSAGE])
+        self.assertIsNotNone(job.finished_at)
+        recent.refresh_from_db()
+        self.assertEqual(recent.status, ShowSessionImportJob.Status.RUNNING)
+
+    def test_job_failed_while_running_is_not_overwritten(self):
+        job = ShowSessionImportJob.objects.create(
+            file=csv_upload(("Mars", "Main", show_time(0)))
+        )
+
+        def fail_then_batch(rows, size):
+            # As fail_stale_jobs would from another worker.
+            ShowSessionImportJob.objects.filter(pk=job.pk).update(
+                status=ShowSessionImportJob.Status.FAILED,
+                errors=[STALE_JOB_MESSAGE],
+            )
+            yield from batched(rows, size)
+
+        with mock.patch("api.jobs.batched", fail_then_batch):
+            with self.assertLogs("api.jobs", "WARNING"):
+                process_import_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ShowSessionImportJob.Status.FAILED)
+        self.assertEqual(job.errors, [STALE_JOB_MESSAGE])
+        self.assertEqual(job.rows_processed, 0)
+        self.assertEqual(ShowSession.objects.count(), 0)
@@ -0,0 +1,614 @@
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer
+from importlib.util import find_spec
+from types import SimpleNamespace
+from unittest import IsolatedAsyncioTestCase, mock, skipUnless
+
+import fakeredis
+import httpx
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import LiveServerTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from telegram.error import RetryAfter
+
+import telegram_bot
+from api.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    Ticket,
+)
+from api.seat_holds import get_redis
+from api.telegram_links import telegram_link_key
+from benchmarks.fake_telegram import (
+    FakeTelegram,
+    converse,
+    make_handler,
+    message_update,
+)
+from telegram_bot import ChatNotifier, LookupCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class LookupCacheTests(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.clock = Clock()
+        # Only the bot's clock; the event loop keeps the real one.
+        patcher = mock.patch(
+            "telegram_bot.time", SimpleNamespace(monotonic=self.clock)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.calls = []
+
+    def fetch(self, key):
+        async def fetch():
+            self.calls.append(key)
+            return key.upper()
+
+        return fetch
+
+    async def test_results_expire_after_the_ttl(self):
+        cache = LookupCache(maxsize=10, ttl=30)
+
+        self.assertEqual(await cache.get("a", self.fetch("a")), "A")
+        self.clock.now += 29
+        self.assertEqual(await cache.get("a", self.fetch("a")), "A")
+        self.assertEqual(self.calls, ["a"])
+
+        self.clock.now += 2
+        self.assertEqual(await cache.get("a", self.fetch("a")), "A")
+        self.assertEqual(self.calls, ["a", "a"])
+
+    async def test_least_recently_used_result_is_evicted(self):
+        cache = LookupCache(maxsize=2, ttl=30)
+        for key in ("a", "b", "a", "c"):
+            await cache.get(key, self.fetch(key))
+
+        self.assertEqual(list(cache._entries), ["a", "c"])
+        await cache.get("a", self.fetch("a"))
+        await cache.get("b", self.fetch("b"))
+        self.assertEqual(self.calls, ["a", "b", "c", "b"])
+        self.assertEqual(len(cache._entries), 2)
+
+    async def test_concurrent_lookups_share_one_call(self):
+        cache = LookupCache()
+        release = asyncio.Event()
+
+        async def fetch():
+            self.calls.append("a")
+            await release.wait()
+            return "A"
+
+        waiters = [asyncio.create_task(cache.get("a", fetch)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+
+        self.assertEqual(await asyncio.gather(*waiters), ["A"] * 5)
+        self.assertEqual(self.calls, ["a"])
+        self.assertEqual(cache._in_flight, {})
+
+    async def test_cancelled_caller_does_not_cancel_the_shared_call(self):
+        cache = LookupCache()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "A"
+
+        first = asyncio.create_task(cache.get("a", fetch))
+        second = asyncio.create_task(cache.get("a", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        self.assertEqual(await second, "A")
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+        self.assertEqual(await cache.get("a", self.fetch("a")), "A")
+        self.assertEqual(self.calls, [])
+
+    async def test_failures_and_uncacheable_results_are_not_kept(self):
+        cache = LookupCache()
+
+        async def fail():
+            self.calls.append("fail")
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            await cache.get("a", fail)
+        await cache.get("a", self.fetch("a"), cacheable=lambda value: False)
+        await cache.get("a", self.fetch("a"))
+
+        self.assertEqual(self.calls, ["fail", "a", "a"])
+
+    async def test_email_spellings_share_a_lookup(self):
+        application = SimpleNamespace(
+            bot_data={"tickets_cache": LookupCache(), "http_client": None}
+        )
+        with mock.patch(
+            "telegram_bot.fetch_tickets",
+            mock.AsyncMock(return_value=(200, {"status": "success"})),
+        ) as fetch_tickets:
+            for email in ("admin@example.com", " Admin@Example.com\n"):
+                await telegram_bot.lookup_tickets(application, email)
+
+        fetch_tickets.assert_awaited_once_with(None, "admin@example.com")
+
+
+class ChatStartedTests(IsolatedAsyncioTestCase):
+    def context(self, redis_client):
+        return SimpleNamespace(
+            chat_data={}, bot_data={"redis": redis_client}
+        )
+
+    async def test_start_is_shared_between_replicas(self):
+        redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        first, second = self.context(redis_client), self.context(redis_client)
+
+        self.assertFalse(await telegram_bot.is_chat_started(second, 7))
+        await telegram_bot.mark_chat_started(first, 7)
+
+        self.assertTrue(await telegram_bot.is_chat_started(second, 7))
+        self.assertFalse(await telegram_bot.is_chat_started(second, 8))
+        self.assertLessEqual(
+            await redis_client.ttl(telegram_bot.started_key(7)),
+            telegram_bot.CHAT_STARTED_TTL,
+        )
+
+    async def test_without_redis_the_chat_data_is_used(self):
+        context = self.context(None)
+
+        await telegram_bot.mark_chat_started(context, 7)
+
+        self.assertTrue(await telegram_bot.is_chat_started(context, 7))
+        self.assertFalse(
+            await telegram_bot.is_chat_started(self.context(None), 7)
+        )
+
+
+async def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out")
+        await asyncio.sleep(0.005)
+
+
+async def wait_for_async(value, expected, timeout=2):
+    deadline = time.monotonic() + timeout
+    while await value() != expected:
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out")
+        await asyncio.sleep(0.005)
+
+
+class FakeBot:
+    """Records sent messages; raises RetryAfter for each of ``retry_after``."""
+
+    def __init__(self, retry_after=()):
+        self.retry_after = list(retry_after)
+        self.attempts = []
+        self.sent = []
+        self.on_send = None
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.attempts.append((chat_id, text, time.monotonic()))
+        await asyncio.sleep(0)
+        if self.on_send is not None:
+            self.on_send()
+            self.on_send = None
+        if self.retry_after:
+            raise RetryAfter(self.retry_after.pop(0))
+        self.sent.append((chat_id, text, time.monotonic()))
+
+
+class ChatNotifierTests(IsolatedAsyncioTestCase):
+    def notifier(self, bot, **options):
+        options = {"batch_delay": 0.01, "min_interval": 0, **options}
+        return ChatNotifier(bot, **options)
+
+    async def test_lines_of_a_chat_are_sent_as_one_message(self):
+        bot = FakeBot()
+        notifier = self.notifier(bot)
+
+        notifier.add(1, ["a"])
+        notifier.add(1, ["b"])
+        notifier.add(2, ["c"])
+        await wait_for(lambda: len(bot.sent) == 2)
+
+        self.assertEqual(
+            sorted(text for _, text, _ in bot.sent),
+            ["<b>New tickets:</b>\na\nb", "<b>New tickets:</b>\nc"],
+        )
+
+    async def test_lines_past_max_lines_are_counted(self):
+        bot = FakeBot()
+        notifier = self.notifier(bot, max_lines=2)
+
+        notifier.add(1, ["a", "b", "c"])
+        notifier.add(1, ["d"])
+        await wait_for(lambda: bot.sent)
+
+        self.assertEqual(
+            bot.sent[0][1], "<b>New tickets:</b>\na\nb\n…and 2 more."
+        )
+
+    async def test_messages_of_a_chat_are_spaced_by_min_interval(self):
+        bot = FakeBot()
+        notifier = self.notifier(bot, min_interval=0.1)
+
+        notifier.add(1, ["a"])
+        await wait_for(lambda: bot.sent)
+        notifier.add(1, ["b"])
+        await wait_for(lambda: len(bot.sent) == 2)
+
+        self.assertGreaterEqual(bot.sent[1][2] - bot.sent[0][2], 0.1)
+
+    async def test_retried_batch_goes_before_newer_lines(self):
+        bot = FakeBot(retry_after=[0.05])
+        notifier = self.notifier(bot)
+        bot.on_send = lambda: notifier.add(1, ["c"])
+
+        notifier.add(1, ["a", "b"])
+        await wait_for(lambda: bot.sent)
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(
+            [text for _, text, _ in bot.sent],
+            ["<b>New tickets:</b>\na\nb\nc"],
+        )
+        self.assertGreaterEqual(bot.sent[0][2] - bot.attempts[0][2], 0.05)
+
+    async def test_drain_retries_instead_of_dropping(self):
+        bot = FakeBot(retry_after=[0.05])
+        notifier = self.notifier(bot, batch_delay=10)
+
+        notifier.add(1, ["a"])
+        await notifier.drain()
+
+        self.assertEqual(
+            [text for _, text, _ in bot.sent], ["<b>New tickets:</b>\na"]
+        )
+        self.assertEqual(len(bot.attempts), 2)
+
+    async def test_drain_waits_for_a_send_in_flight(self):
+        bot = FakeBot(retry_after=[0.05])
+        notifier = self.notifier(bot)
+
+        notifier.add(1, ["a"])
+        await wait_for(lambda: bot.attempts)
+        await notifier.drain()
+
+        self.assertEqual(
+            [text for _, text, _ in bot.sent], ["<b>New tickets:</b>\na"]
+        )
+
+
+def booked_event(email, title="Mars"):
+    return {
+        "event": json.dumps(
+            {
+                "type": "tickets.booked",
+                "email": email,
+                "reservation": 1,
+                "tickets": [
+                    {
+                        "title": title,
+                        "show_time": "2030-01-01T20:00:00",
+                        "dome": "Main",
+                        "row": 1,
+                        "seat": 2,
+                    }
+                ],
+            }
+        )
+    }
+
+
+class RedisTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        self.addAsyncCleanup(self.redis.aclose)
+        self.notifier = mock.Mock(spec=ChatNotifier)
+        self.application = SimpleNamespace(
+            bot_data={"redis": self.redis, "notifier": self.notifier}
+        )
+
+    def update(self, chat_id):
+        return SimpleNamespace(
+            effective_chat=SimpleNamespace(id=chat_id),
+            message=SimpleNamespace(reply_text=mock.AsyncMock()),
+        )
+
+    def context(self, args=()):
+        return SimpleNamespace(
+            application=self.application,
+            bot_data=self.application.bot_data,
+            chat_data={},
+            user_data={},
+            args=list(args),
+        )
+
+    async def linked_chats(self, email):
+        return await self.redis.smembers(telegram_bot.chats_key(email))
+
+
+class ChatLinkTests(RedisTestCase):
+    async def test_link_moves_the_chat_to_the_new_email(self):
+        await telegram_bot.link_chat(self.application, 5, "a@test.com")
+        await telegram_bot.link_chat(self.application, 6, "a@test.com")
+        await telegram_bot.link_chat(self.application, 5, "b@test.com")
+
+        self.assertEqual(await self.linked_chats("a@test.com"), {"6"})
+        self.assertEqual(await self.linked_chats("b@test.com"), {"5"})
+
+        await telegram_bot.unlink_chat(self.application, 5)
+
+        self.assertEqual(await self.linked_chats("b@test.com"), set())
+        self.assertIsNone(await self.redis.get(telegram_bot.chat_key(5)))
+
+    async def test_start_with_a_link_code_links_once(self):
+        await self.redis.set(telegram_bot.link_code_key("c0de"), "a@test.com")
+        update = self.update(5)
+
+        await telegram_bot.start(update, self.context(["c0de"]))
+
+        self.assertEqual(await self.linked_chats("a@test.com"), {"5"})
+        self.assertIn(
+            "a@test.com", update.message.reply_text.await_args_list[0].args[0]
+        )
+
+        await telegram_bot.start(self.update(6), self.context(["c0de"]))
+        self.assertEqual(await self.linked_chats("a@test.com"), {"5"})
+
+    async def test_lookup_does_not_link_the_chat(self):
+        context = self.context()
+        context.user_data["email"] = "a@test.com"
+        with mock.patch(
+            "telegram_bot.lookup_tickets",
+            mock.AsyncMock(return_value=(200, {"status": "success"})),
+        ):
+            await telegram_bot.send_email_request(self.update(5), context)
+
+        self.assertEqual(await self.linked_chats("a@test.com"), set())
+
+
+class ConsumeTicketEventsTests(RedisTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        await self.redis.xgroup_create(
+            telegram_bot.TICKET_EVENTS_STREAM,
+            telegram_bot.TICKET_EVENTS_GROUP,
+            id="$",
+            mkstream=True,
+        )
+        await telegram_bot.link_chat(self.application, 5, "a@test.com")
+
+    async def consume_until_acknowledged(self, entries):
+        consumer = asyncio.create_task(
+            telegram_bot.consume_ticket_events(self.application)
+        )
+        try:
+            await wait_for_async(self.acknowledged, entries)
+        finally:
+            consumer.cancel()
+            await asyncio.gather(consumer, return_exceptions=True)
+
+    async def acknowledged(self):
+        (group,) = await self.redis.xinfo_groups(
+            telegram_bot.TICKET_EVENTS_STREAM
+        )
+        delivered = await self.redis.xrange(
+            telegram_bot.TICKET_EVENTS_STREAM, max=group["last-delivered-id"]
+        )
+        return len(delivered) if not group["pending"] else None
+
+    async def test_events_notify_linked_chats_and_are_acknowledged(self):
+        await self.redis.xadd(
+            telegram_bot.TICKET_EVENTS_STREAM, booked_event("a@test.com")
+        )
+        await self.redis.xadd(
+            telegram_bot.TICKET_EVENTS_STREAM, booked_event("b@test.com")
+        )
+        await self.redis.xadd(
+            telegram_bot.TICKET_EVENTS_STREAM, {"event": "not json"}
+        )
+
+        with self.assertLogs("telegram_bot", "ERROR"):
+            await self.consume_until_acknowledged(3)
+
+        self.notifier.add.assert_called_once_with(
+            5, ["<b>Mars</b>, 2030-01-01 20:00, Main, Row: 1, Seat: 2"]
+        )
+
+    async def test_entries_left_by_a_stopped_replica_are_claimed(self):
+        await self.redis.xadd(
+            telegram_bot.TICKET_EVENTS_STREAM, booked_event("a@test.com")
+        )
+        await self.redis.xreadgroup(
+            telegram_bot.TICKET_EVENTS_GROUP,
+            "stopped-replica",
+            {telegram_bot.TICKET_EVENTS_STREAM: ">"},
+        )
+        self.assertIsNone(await self.acknowledged())
+
+        with mock.patch("telegram_bot.TICKET_EVENTS_CLAIM_IDLE", 0):
+            await self.consume_until_acknowledged(1)
+
+        self.notifier.add.assert_called_once()
+
+
+class TelegramLinkViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="visitor@test.com", password="password"
+        )
+
+    @override_settings(TELEGRAM_BOT_USERNAME="planetarium_bot")
+    def test_issues_a_one_time_code_for_the_user(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(reverse("api:telegram-link"))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        code = response.data["code"]
+        key = telegram_link_key(code)
+        self.addCleanup(get_redis().delete, key)
+        self.assertEqual(get_redis().get(key), "visitor@test.com")
+        self.assertEqual(key, telegram_bot.link_code_key(code))
+        self.assertEqual(
+            response.data["link"], f"https://t.me/planetarium_bot?start={code}"
+        )
+        self.assertLessEqual(
+            get_redis().ttl(key), settings.TELEGRAM_LINK_CODE_TTL
+        )
+
+    def test_requires_authentication(self):
+        response = self.client.post(reverse("api:telegram-link"))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out")
+        time.sleep(0.05)
+
+
+@skipUnless(find_spec("tornado"), "python-telegram-bot[webhooks] is missing")
+@override_settings(TICKET_EVENTS={"BACKEND": "api.events.LocalEventStream"})
+class WebhookTests(LiveServerTestCase):
+    """Run the bot in webhook mode against the fake Bot API and the API."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email="visitor@test.com", password="password"
+        )
+        show_session = ShowSession.objects.create(
+            astronomy_show=AstronomyShow.objects.create(
+                title="Mars", description="Red"
+            ),
+            planetarium_dome=PlanetariumDome.objects.create(
+                name="Main", rows=5, seats_in_row=10
+            ),
+            show_time=datetime.now() + timedelta(days=1),
+        )
+        Ticket.objects.create(
+            row=1,
+            seat=2,
+            show_session=show_session,
+            reservation=Reservation.objects.create(user=user),
+        )
+
+        self.telegram = FakeTelegram()
+        server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), make_handler(self.telegram)
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        webhook_port = free_port()
+        self.options = SimpleNamespace(
+            webhook_url=f"http://127.0.0.1:{webhook_port}/telegram",
+            api_url=f"http://127.0.0.1:{server.server_port}",
+            email="visitor@test.com",
+            secret="secret",
+            timeout=30,
+        )
+
+        self.log = tempfile.TemporaryFile()
+        self.addCleanup(self.log.close)
+        self.bot = subprocess.Popen(
+            [sys.executable, "telegram_bot.py"],
+            cwd=settings.BASE_DIR,
+            env={
+                **os.environ,
+                "TELEGRAM_TOKEN": "1:token",
+                "TELEGRAM_API_URL": self.options.api_url,
+                "PLANETARIUM_API_URL": self.live_server_url,
+                "BOT_MODE": "webhook",
+                "BOT_WEBHOOK_URL": self.options.webhook_url,
+                "BOT_WEBHOOK_LISTEN": "127.0.0.1",
+                "BOT_WEBHOOK_PORT": str(webhook_port),
+                "BOT_WEBHOOK_SECRET": self.options.secret,
+                "REDIS_URL": "",
+                "REDIS_HOST": "",
+            },
+            stdout=self.log,
+            stderr=subprocess.STDOUT,
+        )
+        self.addCleanup(self.stop_bot)
+        wait_until(lambda: self.telegram.webhook or self.bot.poll())
+
+    def stop_bot(self):
+        if self.bot.poll() is None:
+            self.bot.kill()
+            self.bot.wait()
+
+    def messages(self, chat_id):
+        with self.telegram.lock:
+            return [
+                message["text"]
+                for message in self.telegram.messages.get(chat_id, [])
+            ]
+
+    async def talk(self):
+        update_ids = itertools.count(1)
+        async with httpx.AsyncClient(timeout=10) as client:
+            # Not started, so the email is ignored.
+            response = await client.post(
+                self.options.webhook_url,
+                json=message_update(next(update_ids), 1, "visitor@test.com"),
+                headers={"X-Telegram-Bot-Api-Secret-Token": "secret"},
+            )
+            response.raise_for_status()
+            return await converse(client, self.options, 2, update_ids)
+
+    def test_start_and_look_up_tickets(self):
+        self.assertEqual(
+            self.telegram.webhook.get("url"), self.options.webhook_url
+        )
+
+        latency = asyncio.run(self.talk())
+
+        self.assertIsNotNone(latency)
+        tickets = self.messages(2)[2]
+        self.assertIn("<b>Mars</b>", tickets)
+        self.assertIn("Row: 1, Seat: 2", tickets)
+        self.assertEqual(self.messages(1), [])
+
+        # SIGTERM stops the listener and exits cleanly.
+        self.bot.terminate()
+        self.assertEqual(self.bot.wait(timeout=30), 0)
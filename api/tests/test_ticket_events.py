@@ -0,0 +1,144 @@
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.events import RedisEventStream, get_event_stream
+from api.models import AstronomyShow, PlanetariumDome, Reservation, ShowSession, Ticket
+
+API_SHOW_SESSION_BOOK = "api:show-session-book"
+
+
+@override_settings(TICKET_EVENTS={"BACKEND": "api.events.LocalEventStream"})
+class TicketEventTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        get_event_stream.cache_clear()
+        self.addCleanup(get_event_stream.cache_clear)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com", password="password"
+        )
+        self.client.force_authenticate(self.user)
+        self.show_time = (datetime.now() + timedelta(days=1)).replace(microsecond=0)
+        self.show_session = ShowSession.objects.create(
+            astronomy_show=AstronomyShow.objects.create(
+                title="Mars", description="Red"
+            ),
+            planetarium_dome=PlanetariumDome.objects.create(
+                name="Main", rows=5, seats_in_row=10
+            ),
+            show_time=self.show_time,
+        )
+
+    def book(self, *pairs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse(API_SHOW_SESSION_BOOK, args=[self.show_session.pk]),
+                {"seats": [{"row": row, "seat": seat} for row, seat in pairs]},
+                format="json",
+            )
+
+    def test_booking_publishes_one_event(self):
+        response = self.book((1, 1), (1, 2))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            get_event_stream().events,
+            [
+                {
+                    "type": "tickets.booked",
+                    "email": "user@test.com",
+                    "reservation": Reservation.objects.get().pk,
+                    "tickets": [
+                        {
+                            "title": "Mars",
+                            "show_time": self.show_time,
+                            "dome": "Main",
+                            "row": 1,
+                            "seat": seat,
+                        }
+                        for seat in (1, 2)
+                    ],
+                }
+            ],
+        )
+
+    def test_rejected_booking_publishes_nothing(self):
+        self.book((1, 1))
+        response = self.book((1, 1), (1, 2))
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(len(get_event_stream().events), 1)
+
+    def test_saved_ticket_publishes_event(self):
+        reservation = Reservation.objects.create(user=self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.create(
+                row=2, seat=3, show_session=self.show_session, reservation=reservation
+            )
+
+        (event,) = get_event_stream().events
+        self.assertEqual(event["reservation"], reservation.pk)
+        self.assertEqual(
+            [(ticket["row"], ticket["seat"]) for ticket in event["tickets"]], [(2, 3)]
+        )
+
+    def test_saved_ticket_event_reuses_loaded_relations(self):
+        reservation = Reservation.objects.create(user=self.user)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Ticket.objects.create(
+                row=2, seat=3, show_session=self.show_session, reservation=reservation
+            )
+        with self.assertNumQueries(0):
+            for callback in callbacks:
+                callback()
+
+        (event,) = get_event_stream().events
+        self.assertEqual(event["email"], "user@test.com")
+        self.assertEqual(event["tickets"][0]["title"], "Mars")
+        self.assertEqual(event["tickets"][0]["dome"], "Main")
+
+    def test_saved_ticket_event_loads_missing_relations(self):
+        reservation = Reservation.objects.create(user=self.user)
+        show_session = ShowSession.objects.get()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Ticket.objects.create(
+                row=2,
+                seat=3,
+                show_session=show_session,
+                reservation=Reservation.objects.get(pk=reservation.pk),
+            )
+        # The show and the dome, then the owner's email.
+        with self.assertNumQueries(3):
+            for callback in callbacks:
+                callback()
+
+        (event,) = get_event_stream().events
+        self.assertEqual(event["email"], "user@test.com")
+        self.assertEqual(event["tickets"][0]["title"], "Mars")
+
+
+class RedisEventStreamTests(TestCase):
+    def test_publish_appends_json_to_stream(self):
+        stream = RedisEventStream(
+            settings.CACHES["default"]["LOCATION"], stream="test:ticket-events"
+        )
+        self.addCleanup(stream._client.delete, stream.stream)
+
+        stream.publish({"type": "tickets.booked", "show_time": datetime(2030, 1, 1)})
+
+        ((_, fields),) = stream._client.xrange(stream.stream)
+        self.assertEqual(
+            json.loads(fields[b"event"]),
+            {"type": "tickets.booked", "show_time": "2030-01-01T00:00:00"},
+        )
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    ShowTheme,
+    Ticket,
+)
+
+API_TICKET = "api:ticket-list"
+API_TICKET_DETAIL = "api:ticket-detail"
+API_SHOW_SESSION_DETAIL = "api:show-session-detail"
+
+
+class TicketQueryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.dome = PlanetariumDome.objects.create(
+            name="Main", rows=10, seats_in_row=10
+        )
+        self.themes = [
+            ShowTheme.objects.create(name="Planets"),
+            ShowTheme.objects.create(name="Stars"),
+        ]
+        self.create_tickets(3)
+        self.client.force_authenticate(get_user_model().objects.first())
+
+    def create_tickets(self, count):
+        for index in range(count):
+            user = get_user_model().objects.create_user(
+                email=f"user{Ticket.objects.count()}@test.com", password="password"
+            )
+            show = AstronomyShow.objects.create(
+                title=f"Show {Ticket.objects.count()}", description="Sky"
+            )
+            show.show_theme.set(self.themes)
+            Ticket.objects.create(
+                row=1,
+                seat=1,
+                show_session=ShowSession.objects.create(
+                    astronomy_show=show,
+                    planetarium_dome=self.dome,
+                    show_time=datetime.now() + timedelta(days=index + 1),
+                ),
+                reservation=Reservation.objects.create(user=user),
+            )
+
+    def test_list_query_count_does_not_grow_with_tickets(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse(API_TICKET))
+        self.assertEqual(len(response.data["results"]), 3)
+
+        self.create_tickets(7)
+        cache.clear()
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse(API_TICKET))
+        self.assertEqual(len(response.data["results"]), 10)
+
+    def test_retrieve_query_count(self):
+        ticket = Ticket.objects.first()
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse(API_TICKET_DETAIL, args=[ticket.pk]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["show_session"]["show_theme"], ["Planets", "Stars"]
+        )
+
+    def test_show_session_retrieve_query_count(self):
+        show_session = ShowSession.objects.first()
+
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse(API_SHOW_SESSION_DETAIL, args=[show_session.pk])
+            )
+
+        self.assertEqual(response.data["show_theme"], ["Planets", "Stars"])
+
+    def test_clean_loads_dome_dimensions_once(self):
+        show_session_id = Ticket.objects.values_list("show_session", flat=True)[0]
+
+        ticket = Ticket(row=10, seat=10, show_session_id=show_session_id)
+        with self.assertNumQueries(1):
+            ticket.clean()
+
+        ticket.show_session = ShowSession.objects.select_related(
+            "planetarium_dome"
+        ).get(pk=show_session_id)
+        ticket.seat = 11
+        with self.assertNumQueries(0):
+            with self.assertRaisesMessage(ValidationError, "Invalid seat"):
+                ticket.clean()
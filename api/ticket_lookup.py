@@ -0,0 +1,66 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from api.models import Ticket
+from api.response_cache import bump_versions, get_versions
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def email_digest(email):
+    return hashlib.md5(email.encode()).hexdigest()
+
+
+def tickets_by_email_version_key(email):
+    return f"tickets-by-email:version:{email_digest(email)}"
+
+
+def build_tickets_page(email, page, page_size):
+    """Read one page of a user's tickets with a single joined query.
+
+    The user is matched through the reservation join instead of being
+    loaded first; an extra row is fetched to tell whether a next page exists.
+    """
+    offset = (page - 1) * page_size
+    tickets = list(
+        Ticket.objects.filter(reservation__user__email=email)
+        .order_by("-show_session__show_time", "show_session", "row", "seat")
+        .values(
+            "row",
+            "seat",
+            title=F("show_session__astronomy_show__title"),
+            show_time=F("show_session__show_time"),
+            dome=F("show_session__planetarium_dome__name"),
+        )[offset : offset + page_size + 1]
+    )
+    return {
+        "tickets": tickets[:page_size],
+        "has_next": len(tickets) > page_size,
+    }
+
+
+def find_tickets_by_email(email, page=1, page_size=PAGE_SIZE):
+    """Return a cached page of tickets reserved by the user with ``email``.
+
+    Pages are cached under a per-email version, which is bumped whenever one
+    of the user's reservations or tickets changes, so a stale page is never
+    served. Changes to shows, sessions or domes show up once the page
+    expires after ``TICKETS_BY_EMAIL_CACHE_TIMEOUT``.
+    """
+    (version,) = get_versions([tickets_by_email_version_key(email)])
+    key = (
+        f"tickets-by-email:{email_digest(email)}:{version}:{page}:{page_size}"
+    )
+    result = cache.get(key)
+    if result is None:
+        result = build_tickets_page(email, page, page_size)
+        cache.set(key, result, settings.TICKETS_BY_EMAIL_CACHE_TIMEOUT)
+    return result
+
+
+def invalidate_tickets_by_email(email):
+    bump_versions(tickets_by_email_version_key(email))
@@ -9,6 +9,8 @@ from api.views.planetarium_views import (
     TicketViewSet,
     ReservationViewSet,
     ShowSessionUploadView,
+    ShowSessionImportJobView,
+    TelegramLinkView,
     get_tickets_by_email,
 )
 
@@ -27,7 +29,13 @@ urlpatterns = [
         ShowSessionUploadView.as_view(),
         name="upload-show-sessions",
     ),
+    path(
+        "upload-show-sessions/<uuid:job_id>/",
+        ShowSessionImportJobView.as_view(),
+        name="upload-show-sessions-job",
+    ),
     path("tickets-by-email/", get_tickets_by_email, name="get_tickets_by_email"),
+    path("telegram-link/", TelegramLinkView.as_view(), name="telegram-link"),
 ]
 
 app_name = "api"
@@ -2,18 +2,28 @@ from datetime import timedelta
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 
+SHOW_TIME_SPACING = timedelta(hours=1)
+SHOW_TIME_IN_PAST_MESSAGE = "Show time must be provided in the future"
+SHOW_TIME_CONFLICT_MESSAGE = (
+    "Show time must be at least 1 hour apart from the previous show time."
+)
+# Enforced by the database, see ``ShowSession.Meta.constraints``.
+SHOW_TIME_CONFLICT_CONSTRAINT = "show_session_no_overlap"
+# See ``Ticket.Meta.constraints``.
+UNIQUE_TICKET_CONSTRAINT = "unique_ticket"
 
-def validate_show_time(show_time, astronomy_show, planetarium_dome, qs, instance=None):
+
+def validate_show_time_in_future(show_time):
     if show_time <= timezone.now():
-        raise ValidationError("Show time must be provided in the future")
+        raise ValidationError(SHOW_TIME_IN_PAST_MESSAGE)
+
+
+def violated_constraint(error):
+    """Name of the constraint an ``IntegrityError`` was raised by, if known."""
+    diag = getattr(error.__cause__, "diag", None)
+    return getattr(diag, "constraint_name", None)
+
 
-    qs = qs.exclude(pk=instance.pk if instance else None)
-    qs = qs.filter(
-        astronomy_show=astronomy_show,
-        planetarium_dome=planetarium_dome,
-    )
-    one_hour = timedelta(hours=1)
-    if qs.filter(show_time__gte=show_time - one_hour, show_time__lt=show_time).exists():
-        raise ValidationError(
-            "Show time must be at least 1 hour apart from the previous show time."
-        )
+def is_show_time_conflict(error):
+    """Whether an ``IntegrityError`` was raised by the show time constraint."""
+    return violated_constraint(error) == SHOW_TIME_CONFLICT_CONSTRAINT
@@ -1,20 +1,26 @@
-import csv
-from datetime import datetime
+from collections import defaultdict
+from datetime import datetime, timedelta
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.contrib.auth.models import User
-from django.core.exceptions import ValidationError
 from django.http import JsonResponse
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.views.decorators.csrf import csrf_exempt
 from drf_spectacular.utils import extend_schema_view
-from rest_framework import viewsets, status
-from django.db.models import BooleanField, Case, When, Value
+from rest_framework import generics, viewsets, status
+from rest_framework.decorators import action
+from django.db.models import BooleanField, Case, F, When, Value
+from rest_framework.exceptions import ValidationError
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from api.booking import book_seats, hold_show_session_seats
+from api.conditional import ConditionalGetMixin
+from api.importers import ShowSessionImporter, iter_csv_rows
+from api.jobs import enqueue_import_job
 from api.models import (
     ShowTheme,
     AstronomyShow,
@@ -22,7 +28,9 @@ from api.models import (
     PlanetariumDome,
     Ticket,
     Reservation,
+    ShowSessionImportJob,
 )
+from api.response_cache import ModelVersionCacheMixin
 from api.schemas import (
     AstronomyShowSchema,
     ShowSessionSchema,
@@ -31,6 +39,8 @@ from api.schemas import (
     ReservationSchema,
     ShowSessionUploadSchema,
 )
+from api.seat_holds import count_held_seats, get_holds_state
+from api.seat_map import get_seat_map
 from api.serializers.planetarium_serializers import (
     ShowThemeSerializer,
     AstronomyShowSerializer,
@@ -44,19 +54,78 @@ from api.serializers.planetarium_serializers import (
     ReservationCreateSerializer,
     AstronomyShowListSerializer,
     TicketRetrieveSerializer,
+    ShowSessionImportJobSerializer,
+    ShowSessionBookingSerializer,
+    BookedTicketSerializer,
+    SeatHoldSerializer,
+    TelegramLinkSerializer,
 )
-from api.validators import validate_show_time
+from api.ticket_lookup import MAX_PAGE_SIZE, PAGE_SIZE, find_tickets_by_email
 
+SHOW_TIME_PARTS = ("year", "month", "day", "hour")
 
-class ShowThemeViewSet(viewsets.ModelViewSet):
+
+def show_time_bounds(year, month=None, day=None, hour=None):
+    """Return the half-open ``[start, end)`` range of a year, month, day or
+    hour.
+
+    ``None`` means the values do not form a valid date; ``end`` is ``None``
+    when the range runs past ``datetime.max``.
+    """
+    try:
+        start = datetime(
+            year,
+            1 if month is None else month,
+            1 if day is None else day,
+            0 if hour is None else hour,
+        )
+    except ValueError:
+        return None
+
+    try:
+        if hour is not None:
+            end = start + timedelta(hours=1)
+        elif day is not None:
+            end = start + timedelta(days=1)
+        elif month is not None:
+            end = start.replace(year=year + month // 12, month=month % 12 + 1)
+        else:
+            end = start.replace(year=year + 1)
+    except (ValueError, OverflowError):
+        end = None
+
+    return start, end
+
+
+def parse_show_time(name, value):
+    """Parse an ISO date or datetime query parameter into a naive datetime."""
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            date = parse_date(value)
+            parsed = date and datetime(date.year, date.month, date.day)
+    except ValueError:
+        parsed = None
+
+    if parsed is None:
+        raise ValidationError(
+            {name: "An ISO 8601 date or datetime is required."}
+        )
+    if timezone.is_aware(parsed):
+        parsed = timezone.make_naive(parsed)
+    return parsed
+
+
+class ShowThemeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = ShowTheme.objects.all()
     serializer_class = ShowThemeSerializer
 
 
 @extend_schema_view(list=AstronomyShowSchema.list)
-class AstronomyShowViewSet(viewsets.ModelViewSet):
+class AstronomyShowViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = AstronomyShow.objects.all()
     serializer_class = AstronomyShowSerializer
+    conditional_models = (AstronomyShow, ShowTheme)
 
     def get_queryset(self):
         queryset = self.queryset
@@ -88,19 +157,38 @@ class AstronomyShowViewSet(viewsets.ModelViewSet):
 
 
 @extend_schema_view(list=ShowSessionSchema.list)
-class ShowSessionViewSet(viewsets.ModelViewSet):
+class ShowSessionViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = ShowSession.objects.all()
     serializer_class = ShowSessionSerializer
+    estimate_count = True
+    conditional_models = (
+        ShowSession,
+        AstronomyShow,
+        ShowTheme,
+        PlanetariumDome,
+    )
+
+    def get_etag_parts(self, request):
+        # Availability counts seat holds, which expire without a write.
+        return (*super().get_etag_parts(request), get_holds_state())
 
     def get_queryset(self):
         queryset = self.queryset
         queryset = queryset.select_related("astronomy_show", "planetarium_dome")
+        if self.action == "retrieve":
+            queryset = queryset.prefetch_related("astronomy_show__show_theme")
+        queryset = queryset.annotate(
+            capacity=F("planetarium_dome__rows")
+            * F("planetarium_dome__seats_in_row"),
+            available_seats=F("capacity")
+            - F("tickets_sold")
+            - self.held_seats(),
+        )
         astronomy_show = self.request.query_params.get("astronomy_show")
         planetarium_dome = self.request.query_params.get("planetarium_dome")
-        show_time_year = self.request.query_params.get("show_time_year")
-        show_time_month = self.request.query_params.get("show_time_month")
-        show_time_day = self.request.query_params.get("show_time_day")
-        show_time_hour = self.request.query_params.get("show_time_hour")
+        show_time_from = self.request.query_params.get("show_time_from")
+        show_time_to = self.request.query_params.get("show_time_to")
+        available_seats = self.request.query_params.get("available_seats")
 
         if astronomy_show:
             queryset = queryset.filter(astronomy_show__title=astronomy_show)
@@ -108,17 +196,93 @@ class ShowSessionViewSet(viewsets.ModelViewSet):
         if planetarium_dome:
             queryset = queryset.filter(planetarium_dome__name=planetarium_dome)
 
-        if show_time_year:
-            queryset = queryset.filter(show_time__year=show_time_year)
+        queryset = self.filter_show_time_parts(queryset)
+
+        if show_time_from:
+            queryset = queryset.filter(
+                show_time__gte=parse_show_time(
+                    "show_time_from", show_time_from
+                )
+            )
+
+        if show_time_to:
+            queryset = queryset.filter(
+                show_time__lt=parse_show_time("show_time_to", show_time_to)
+            )
+
+        if available_seats:
+            if not available_seats.isdigit():
+                raise ValidationError(
+                    {"available_seats": "A non-negative integer is required."}
+                )
+            queryset = queryset.filter(
+                available_seats__gte=int(available_seats)
+            )
 
-        if show_time_month:
-            queryset = queryset.filter(show_time__month=show_time_month)
+        return queryset
 
-        if show_time_day:
-            queryset = queryset.filter(show_time__day=show_time_day)
+    def held_seats(self):
+        """Return the held seats of each session as a SQL expression.
+
+        Only the list needs them, since retrieve reads the holds of its
+        session directly. Sessions with the same number of held seats share
+        one ``WHEN`` clause.
+        """
+        if self.action != "list":
+            return Value(0)
+
+        sessions_by_count = defaultdict(list)
+        for show_session_id, count in count_held_seats().items():
+            sessions_by_count[count].append(show_session_id)
+        return Case(
+            *(
+                When(pk__in=show_session_ids, then=Value(count))
+                for count, show_session_ids in sessions_by_count.items()
+            ),
+            default=Value(0),
+        )
 
-        if show_time_hour:
-            queryset = queryset.filter(show_time__hour=show_time_hour)
+    def filter_show_time_parts(self, queryset):
+        """Filter by ``show_time_year/month/day/hour`` with a range scan.
+
+        The leading parts that are given (year, then month, ...) become one
+        half-open ``show_time`` range, which can use the index; only parts
+        after a gap, such as a month without a year, fall back to EXTRACT.
+        """
+        parts = {}
+        for part in SHOW_TIME_PARTS:
+            value = self.request.query_params.get(f"show_time_{part}")
+            if value:
+                if not value.isdigit():
+                    raise ValidationError(
+                        {
+                            f"show_time_{part}": (
+                                "A non-negative integer is required."
+                            )
+                        }
+                    )
+                parts[part] = int(value)
+
+        prefix = []
+        for part in SHOW_TIME_PARTS:
+            if part not in parts:
+                break
+            prefix.append(part)
+
+        if prefix:
+            bounds = show_time_bounds(*(parts[part] for part in prefix))
+            if bounds is None:
+                return queryset.none()
+            start, end = bounds
+            queryset = queryset.filter(show_time__gte=start)
+            if end is not None:
+                queryset = queryset.filter(show_time__lt=end)
+
+        for part in SHOW_TIME_PARTS[len(prefix) :]:
+            if part in parts:
+                queryset = queryset.filter(
+                    **{f"show_time__{part}": parts[part]}
+                )
 
         return queryset
 
@@ -136,9 +300,65 @@ class ShowSessionViewSet(viewsets.ModelViewSet):
 
         return serializer_class
 
+    @ShowSessionSchema.seat_map
+    @action(detail=True, methods=["get"], url_path="seat_map")
+    def seat_map(self, request, pk=None):
+        return Response(get_seat_map(self.get_object()))
+
+    @ShowSessionSchema.book
+    @action(
+        detail=True,
+        methods=["post"],
+        permission_classes=(IsAuthenticated,),
+        serializer_class=ShowSessionBookingSerializer,
+    )
+    def book(self, request, pk=None):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        reservation, tickets = book_seats(
+            user=request.user,
+            show_session_id=pk,
+            seats=serializer.validated_data["seats"],
+        )
+        return Response(
+            {
+                "reservation": ReservationSerializer(reservation).data,
+                "tickets": BookedTicketSerializer(tickets, many=True).data,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+    @ShowSessionSchema.hold
+    @action(
+        detail=True,
+        methods=["post"],
+        permission_classes=(IsAuthenticated,),
+        serializer_class=SeatHoldSerializer,
+    )
+    def hold(self, request, pk=None):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        expires_at = hold_show_session_seats(
+            user=request.user,
+            show_session=self.get_object(),
+            seats=serializer.validated_data["seats"],
+            minutes=serializer.validated_data["minutes"],
+        )
+        return Response(
+            {
+                "show_session": int(pk),
+                "seats": [
+                    {"row": row, "seat": seat}
+                    for row, seat in serializer.validated_data["seats"]
+                ],
+                "expires_at": expires_at,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
 
 @extend_schema_view(list=PlanetariumDomeSchema.list)
-class PlanetariumDomeViewSet(viewsets.ModelViewSet):
+class PlanetariumDomeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = PlanetariumDome.objects.all()
     serializer_class = PlanetariumDomeSerializer
 
@@ -194,15 +414,32 @@ class PlanetariumDomeViewSet(viewsets.ModelViewSet):
 
 
 @extend_schema_view(list=TicketSchema.list)
-class TicketViewSet(viewsets.ModelViewSet):
+class TicketViewSet(
+    ConditionalGetMixin, ModelVersionCacheMixin, viewsets.ModelViewSet
+):
     queryset = Ticket.objects.all()
     serializer_class = TicketSerializer
+    estimate_count = True
+    cache_models = (Ticket, Reservation, ShowSession, AstronomyShow)
+    # The default ordering sorts through the reservation join; keyset pages
+    # seek on the primary key instead, which follows booking order.
+    keyset_ordering = ("-id",)
+    # Retrieve nests the session's live availability, including seat holds.
+    conditional_actions = ("list",)
+    conditional_models = cache_models
 
     def get_queryset(self):
         queryset = self.queryset
-        queryset = queryset.select_related("show_session", "reservation")
+        queryset = queryset.select_related(
+            "show_session__astronomy_show", "reservation__user"
+        )
         title = self.request.query_params.get("title")
 
+        if self.action == "retrieve":
+            queryset = queryset.select_related(
+                "show_session__planetarium_dome"
+            ).prefetch_related("show_session__astronomy_show__show_theme")
+
         if title:
             queryset = queryset.filter(show_session__astronomy_show__title=title)
 
@@ -222,15 +459,12 @@ class TicketViewSet(viewsets.ModelViewSet):
 
         return serializer_class
 
-    @method_decorator(cache_page(60 * 60 * 2))
-    def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
-
 
 @extend_schema_view(list=ReservationSchema.list)
-class ReservationViewSet(viewsets.ModelViewSet):
+class ReservationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Reservation.objects.all()
     serializer_class = ReservationSerializer
+    estimate_count = True
 
     def get_queryset(self):
         user = self.request.user
@@ -278,42 +512,28 @@ class ShowSessionUploadView(APIView):
                 {"error": "This is not a CSV file"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        decoded_file = csv_file.read().decode("utf-8").splitlines()
-        reader = csv.DictReader(decoded_file)
-
-        sessions_created = []
-        errors = []
-
-        for row in reader:
-            serializer = ShowSessionSerializer(data=row)
-            if serializer.is_valid():
-                show_time_str = row["show_time"]
-                try:
-                    show_time = datetime.strptime(show_time_str, "%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    errors.append(
-                        "Invalid datetime format for show_time: {}".format(
-                            show_time_str
-                        )
-                    )
-                    continue
-
-                try:
-                    validate_show_time(
-                        show_time=show_time,
-                        astronomy_show=serializer.validated_data["astronomy_show"],
-                        planetarium_dome=serializer.validated_data["planetarium_dome"],
-                        qs=ShowSession.objects.all(),
-                        instance=None,
-                    )
-                except ValidationError as e:
-                    errors.append(str(e))
-                    continue
+        if (
+            request.query_params.get("mode") == "async"
+            or csv_file.size > settings.SHOW_SESSION_UPLOAD_SYNC_MAX_SIZE
+        ):
+            job = ShowSessionImportJob.objects.create(
+                file=csv_file, created_by=request.user
+            )
+            enqueue_import_job(job)
+            return Response(
+                ShowSessionImportJobSerializer(job).data,
+                status=status.HTTP_202_ACCEPTED,
+            )
 
-                show_session = serializer.save()
-                sessions_created.append(show_session)
-            else:
-                errors.append(serializer.errors)
+        try:
+            created, errors = ShowSessionImporter().run(
+                iter_csv_rows(csv_file)
+            )
+        except UnicodeDecodeError:
+            return Response(
+                {"error": "The CSV file must be UTF-8 encoded"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         if errors:
             return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
@@ -321,26 +541,85 @@ class ShowSessionUploadView(APIView):
         return Response(
             {
                 "created_sessions": ShowSessionSerializer(
-                    sessions_created, many=True
+                    created, many=True
                 ).data
             },
             status=status.HTTP_201_CREATED,
         )
 
 
+class ShowSessionImportJobView(generics.RetrieveAPIView):
+    serializer_class = ShowSessionImportJobSerializer
+    lookup_url_kwarg = "job_id"
+
+    def get_queryset(self):
+        queryset = ShowSessionImportJob.objects.all()
+
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(created_by=self.request.user)
+
+        return queryset
+
+
+class TelegramLinkView(generics.CreateAPIView):
+    """Issue a one-time code that subscribes a Telegram chat to new tickets.
+
+    The bot only links chats that send such a code, so nobody can follow
+    the bookings of an email address they do not own.
+    """
+
+    serializer_class = TelegramLinkSerializer
+    permission_classes = (IsAuthenticated,)
+
+
+def positive_int(value, default, maximum=None):
+    if value in (None, ""):
+        return default
+    value = int(value)
+    if value < 1:
+        raise ValueError(value)
+    return min(value, maximum) if maximum else value
+
+
 @csrf_exempt
 def get_tickets_by_email(request):
+    """Return a page of the tickets reserved by ``email`` for the bot.
+
+    Each ticket is a flat object with the show title, show time, dome name,
+    row and seat. ``page`` and ``page_size`` select the page; ``next_page``
+    is null on the last one.
+    """
     if request.method == "POST":
-        email = request.POST.get("email")
+        email = request.POST.get("email") or ""
         try:
-            user = get_user_model().objects.get(email=email)
-            tickets = Ticket.objects.filter(reservation_id=user.id)
-            ticket_data = list(tickets.values())
-            return JsonResponse({"status": "success", "data": ticket_data}, status=200)
-        except User.DoesNotExist:
+            page = positive_int(request.POST.get("page"), 1)
+            page_size = positive_int(
+                request.POST.get("page_size"), PAGE_SIZE, MAX_PAGE_SIZE
+            )
+        except ValueError:
+            return JsonResponse(
+                {"status": "error", "message": "Invalid page or page_size"},
+                status=400,
+            )
+
+        result = find_tickets_by_email(email, page, page_size)
+        if (
+            not result["tickets"]
+            and page == 1
+            and not get_user_model().objects.filter(email=email).exists()
+        ):
             return JsonResponse(
                 {"status": "error", "message": "User not found"}, status=404
             )
+        return JsonResponse(
+            {
+                "status": "success",
+                "data": result["tickets"],
+                "page": page,
+                "next_page": page + 1 if result["has_next"] else None,
+            },
+            status=200,
+        )
     return JsonResponse(
         {"status": "error", "message": "Invalid request method"}, status=400
     )
@@ -0,0 +1,267 @@
+"""Fake Telegram Bot API for running the bot in webhook mode locally.
+
+Serve the Bot API methods the bot calls and record the messages it sends:
+
+    python -m benchmarks.fake_telegram serve --port 8081
+
+Start one or more bot replicas with ``TELEGRAM_API_URL=http://127.0.0.1:8081``,
+``BOT_MODE=webhook`` and a ``BOT_WEBHOOK_URL`` that reaches them, e.g. a load
+balancer in front of the replicas. Then push conversations to it:
+
+    python -m benchmarks.fake_telegram send \\
+        --webhook-url http://127.0.0.1:8443/telegram --email admin@example.com
+
+Every chat sends ``/start`` and an email address; the report has the latency
+percentiles until each chat got its reply.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+
+BOT_USER = {
+    "id": 1,
+    "is_bot": True,
+    "first_name": "Planetarium",
+    "username": "planetarium_bot",
+}
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class FakeTelegram:
+    """Thread-safe state of the fake server: the webhook and sent messages."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.webhook = {}
+        self.messages = {}
+        self.message_ids = itertools.count(1)
+
+    def call(self, method, params):
+        if method == "getMe":
+            return BOT_USER
+        if method == "setWebhook":
+            with self.lock:
+                self.webhook = params
+            return True
+        if method == "deleteWebhook":
+            with self.lock:
+                self.webhook = {}
+            return True
+        if method == "getWebhookInfo":
+            return {
+                "url": self.webhook.get("url", ""),
+                "pending_update_count": 0,
+            }
+        if method == "getUpdates":
+            time.sleep(min(float(params.get("timeout") or 0), 1))
+            return []
+        if method == "sendMessage":
+            chat_id = int(params["chat_id"])
+            message = {
+                "message_id": next(self.message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", ""),
+            }
+            with self.lock:
+                self.messages.setdefault(chat_id, []).append(message)
+            return message
+        return True
+
+
+def make_handler(telegram):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            # /bot<token>/<method>
+            method = urlsplit(self.path).path.rsplit("/", 1)[-1]
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length)
+            content_type = self.headers.get("Content-Type", "")
+            if content_type.startswith("application/json"):
+                params = json.loads(body or b"{}")
+            else:
+                params = {
+                    key: values[0]
+                    for key, values in parse_qs(body.decode()).items()
+                }
+            self.reply({"ok": True, "result": telegram.call(method, params)})
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path != "/messages":
+                self.send_error(404)
+                return
+            chat_id = parse_qs(url.query).get("chat_id", [None])[0]
+            with telegram.lock:
+                messages = (
+                    telegram.messages.get(int(chat_id), [])
+                    if chat_id
+                    else telegram.messages
+                )
+                self.reply(messages)
+
+        def reply(self, data):
+            body = json.dumps(data).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(options):
+    server = ThreadingHTTPServer(
+        (options.host, options.port), make_handler(FakeTelegram())
+    )
+    print(f"Fake Telegram Bot API on http://{options.host}:{options.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+def message_update(update_id, chat_id, text):
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {
+            "id": chat_id,
+            "is_bot": False,
+            "first_name": f"Chat {chat_id}",
+        },
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [
+            {"type": "bot_command", "offset": 0, "length": len(text)}
+        ]
+    return {"update_id": update_id, "message": message}
+
+
+async def wait_for_message(client, options, chat_id, prefix, deadline):
+    """Poll the chat's messages until one starts with ``prefix``."""
+    while time.perf_counter() < deadline:
+        messages = (
+            await client.get(
+                f"{options.api_url}/messages", params={"chat_id": chat_id}
+            )
+        ).json()
+        if any(message["text"].startswith(prefix) for message in messages):
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def converse(client, options, chat_id, update_ids):
+    """Send /start and the email; return the seconds until the tickets reply.
+
+    Like a person, the chat waits for the greeting before sending the email.
+    """
+    headers = {SECRET_HEADER: options.secret} if options.secret else {}
+    started = time.perf_counter()
+    deadline = started + options.timeout
+    # The greeting, then "Sending request...", the tickets and the prompt.
+    for text, reply in (
+        ("/start", "Hello!"),
+        (options.email, "Enter a new email"),
+    ):
+        response = await client.post(
+            options.webhook_url,
+            json=message_update(next(update_ids), chat_id, text),
+            headers=headers,
+        )
+        response.raise_for_status()
+        if not await wait_for_message(
+            client, options, chat_id, reply, deadline
+        ):
+            return None
+    return time.perf_counter() - started
+
+
+def percentiles(values, *points):
+    """Return the ``points`` percentiles of ``values``, which may be empty."""
+    values = list(values) or [0]
+    # quantiles() needs two data points; one is every percentile at once.
+    cuts = statistics.quantiles(
+        values * 2 if len(values) == 1 else values, n=100, method="inclusive"
+    )
+    return [cuts[point - 1] for point in points]
+
+
+async def send(options):
+    update_ids = itertools.count(int(time.time() * 1000))
+    chat_ids = iter(
+        range(options.first_chat, options.first_chat + options.chats)
+    )
+    latencies = []
+    timeouts = 0
+
+    async with httpx.AsyncClient(timeout=options.timeout) as client:
+
+        async def worker():
+            nonlocal timeouts
+            for chat_id in chat_ids:
+                latency = await converse(client, options, chat_id, update_ids)
+                if latency is None:
+                    timeouts += 1
+                else:
+                    latencies.append(latency)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(options.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    p50, p99 = percentiles(
+        (latency * 1000 for latency in latencies), 50, 99
+    )
+    print(
+        f"{len(latencies)} conversations in {elapsed:.2f} s "
+        f"({len(latencies) / elapsed:.1f}/s), {timeouts} timed out; "
+        f"p50 {p50:.1f} ms, p99 {p99:.1f} ms"
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Run the fake Bot API.")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8081)
+
+    send_parser = commands.add_parser(
+        "send", help="Push conversations to a bot."
+    )
+    send_parser.add_argument("--webhook-url", required=True)
+    send_parser.add_argument("--api-url", default="http://127.0.0.1:8081")
+    send_parser.add_argument("--email", required=True)
+    send_parser.add_argument("--secret", help="The bot's BOT_WEBHOOK_SECRET.")
+    send_parser.add_argument("--chats", type=int, default=100)
+    send_parser.add_argument("--first-chat", type=int, default=1000)
+    send_parser.add_argument("--concurrency", type=int, default=20)
+    send_parser.add_argument("--timeout", type=float, default=60)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    options = parse_args()
+    if options.command == "serve":
+        serve(options)
+    else:
+        asyncio.run(send(options))
@@ -0,0 +1,260 @@
+"""HTTP load benchmark for the catalogue, booking and upload paths.
+
+Run the API with ``DJANGO_SETTINGS_MODULE=benchmarks.settings`` against a
+dataset from ``manage.py generate_data``, then:
+
+    python -m benchmarks.load --email admin@example.com --password secret
+
+Every scenario sends ``--requests`` requests from ``--concurrency`` workers
+and reports latency percentiles, throughput and status codes. The results
+are written as JSON to ``benchmarks/results/`` so runs can be compared
+across commits.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+API = "/api/planetarium"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+class Benchmark:
+    def __init__(self, client, requests, concurrency):
+        self.client = client
+        self.requests = requests
+        self.concurrency = concurrency
+
+    async def run(self, name, send):
+        """Call ``send(index)`` ``self.requests`` times from workers."""
+        latencies = []
+        statuses = {}
+        indexes = iter(range(self.requests))
+
+        async def worker():
+            for index in indexes:
+                started = time.perf_counter()
+                try:
+                    status = (await send(index)).status_code
+                except httpx.HTTPError as error:
+                    status = type(error).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        elapsed = time.perf_counter() - started
+
+        milliseconds = np.array(latencies) * 1000
+        result = {
+            "requests": len(latencies),
+            "concurrency": self.concurrency,
+            "seconds": round(elapsed, 3),
+            "throughput": round(len(latencies) / elapsed, 2),
+            "latency_ms": {
+                "mean": round(float(milliseconds.mean()), 2),
+                **{
+                    f"p{percentile}": round(
+                        float(np.percentile(milliseconds, percentile)), 2
+                    )
+                    for percentile in (50, 90, 95, 99)
+                },
+                "max": round(float(milliseconds.max()), 2),
+            },
+            "statuses": statuses,
+        }
+        print(
+            f"{name:<24} {result['throughput']:>9.1f} req/s  "
+            f"p50 {result['latency_ms']['p50']:>8.1f} ms  "
+            f"p99 {result['latency_ms']['p99']:>8.1f} ms  {statuses}"
+        )
+        return result
+
+
+async def first_result(client, path, **params):
+    response = await client.get(
+        f"{API}/{path}/", params={"page_size": 1, **params}
+    )
+    response.raise_for_status()
+    results = response.json()["results"]
+    if not results:
+        raise SystemExit(
+            f"No data at {path}/, run manage.py generate_data first."
+        )
+    return results[0]
+
+
+async def show_session_list(benchmark, client):
+    session = await first_result(client, "show_session")
+    show_time = datetime.strptime(
+        session["show_time_formatted"], "%Y-%m-%d %H:%M"
+    )
+
+    return await benchmark.run(
+        "show_session_by_date",
+        lambda index: client.get(
+            f"{API}/show_session/",
+            params={
+                "show_time_year": show_time.year,
+                "show_time_month": show_time.month,
+                "show_time_day": show_time.day,
+            },
+        ),
+    )
+
+
+async def astronomy_show_by_theme(benchmark, client):
+    theme = await first_result(client, "show_theme")
+
+    return await benchmark.run(
+        "astronomy_show_by_theme",
+        lambda index: client.get(
+            f"{API}/astronomy_show/", params={"show_theme": theme["name"]}
+        ),
+    )
+
+
+async def concurrent_booking(benchmark, client):
+    session = await first_result(
+        client, "show_session", available_seats=benchmark.requests
+    )
+    seat_map = (
+        await client.get(f"{API}/show_session/{session['id']}/seat_map/")
+    ).json()
+    seats = [
+        {"row": row, "seat": seat}
+        for row in range(1, seat_map["rows"] + 1)
+        for seat in range(1, seat_map["seats_in_row"] + 1)
+    ]
+
+    # Writers race for random seats of one session; collisions answer 409.
+    return await benchmark.run(
+        "book_same_session",
+        lambda index: client.post(
+            f"{API}/show_session/{session['id']}/book/",
+            json={"seats": [random.choice(seats)]},
+        ),
+    )
+
+
+async def tickets_by_email(benchmark, client):
+    reservation = await first_result(client, "reservation")
+
+    return await benchmark.run(
+        "tickets_by_email",
+        lambda index: client.post(
+            f"{API}/tickets-by-email/", data={"email": reservation["user"]}
+        ),
+    )
+
+
+async def csv_upload(benchmark, client, rows=100):
+    session = await first_result(client, "show_session")
+    # Far enough ahead to never collide with generated sessions; every
+    # request gets its own block of hourly slots.
+    start = datetime.now().replace(
+        minute=0, second=0, microsecond=0
+    ) + timedelta(days=365 * 50 + random.randrange(365 * 50))
+
+    def upload(index):
+        offset = index * rows
+        lines = ["astronomy_show,planetarium_dome,show_time"] + [
+            f"{session['astronomy_show']},{session['planetarium_dome']},"
+            f"{start + timedelta(hours=(offset + row) * 2):%Y-%m-%d %H:%M:%S}"
+            for row in range(rows)
+        ]
+        content = "\n".join(lines).encode()
+        return client.post(
+            f"{API}/upload-show-sessions/",
+            files={"file": ("sessions.csv", content, "text/csv")},
+        )
+
+    return await benchmark.run(f"csv_upload_{rows}_rows", upload)
+
+
+SCENARIOS = {
+    "show_session_list": show_session_list,
+    "astronomy_show_by_theme": astronomy_show_by_theme,
+    "booking": concurrent_booking,
+    "tickets_by_email": tickets_by_email,
+    "csv_upload": csv_upload,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(options):
+    async with httpx.AsyncClient(
+        base_url=options.base_url,
+        timeout=options.timeout,
+        limits=httpx.Limits(max_connections=options.concurrency),
+    ) as client:
+        token = await client.post(
+            "/accounts/token/",
+            data={"email": options.email, "password": options.password},
+        )
+        token.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {token.json()['access']}"
+
+        benchmark = Benchmark(client, options.requests, options.concurrency)
+        results = {}
+        for name in options.scenarios:
+            results[name] = await SCENARIOS[name](benchmark, client)
+
+    report = {
+        "commit": git_commit(),
+        "started_at": options.started_at.isoformat(timespec="seconds"),
+        "base_url": options.base_url,
+        "scenarios": results,
+    }
+    output = options.output or RESULTS_DIR / (
+        f"{options.started_at:%Y%m%d-%H%M%S}-"
+        f"{report['commit'] or 'local'}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument(
+        "--email", required=True, help="Staff user to log in as."
+    )
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=SCENARIOS,
+        default=list(SCENARIOS),
+    )
+    parser.add_argument("--output", type=Path, help="Path of the JSON report.")
+    options = parser.parse_args()
+    options.started_at = datetime.now()
+    return options
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
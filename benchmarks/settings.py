@@ -0,0 +1,17 @@
+"""Settings for serving the API under load.
+
+Throttling is off so every request reaches the views, and DEBUG is off so
+query logging does not skew the measurements.
+"""
+
+from planetarium.settings import *  # noqa: F401, F403
+from planetarium.settings import REST_FRAMEWORK
+
+DEBUG = False
+
+ALLOWED_HOSTS = ["*"]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_THROTTLE_CLASSES": [],
+}
@@ -22,6 +22,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # External apps
     "rest_framework",
     "rest_framework_simplejwt",
@@ -46,6 +47,46 @@ CACHES = {
     }
 }
 
+SEAT_MAP_CACHE_TIMEOUT = 60 * 60
+
+LIST_CACHE_TIMEOUT = 60 * 60 * 2
+
+TICKETS_BY_EMAIL_CACHE_TIMEOUT = 60 * 5
+
+ESTIMATED_COUNT_THRESHOLD = 100_000
+
+SEAT_HOLD_MINUTES = 10
+
+SEAT_HOLD_MAX_MINUTES = 30
+
+SHOW_SESSION_IMPORT_QUEUE = {
+    "BACKEND": "api.jobs.RedisJobQueue",
+    "OPTIONS": {"url": CACHES["default"]["LOCATION"]},
+}
+
+SHOW_SESSION_IMPORT_MAX_ERRORS = 1000
+
+# Larger uploads are imported in a background job even without ?mode=async,
+# so a request worker never holds the sessions of a bigger file.
+SHOW_SESSION_UPLOAD_SYNC_MAX_SIZE = 1024 * 1024
+
+# Running jobs older than this are failed; keep it above the longest import.
+SHOW_SESSION_IMPORT_JOB_TIMEOUT = 60 * 60
+
+TICKET_EVENTS = {
+    "BACKEND": "api.events.RedisEventStream",
+    "OPTIONS": {
+        "url": CACHES["default"]["LOCATION"],
+        "stream": os.getenv(
+            "TICKET_EVENTS_STREAM", "planetarium:ticket-events"
+        ),
+    },
+}
+
+# One-time codes that link a Telegram chat to the user who requested them.
+TELEGRAM_LINK_CODE_TTL = 10 * 60
+TELEGRAM_BOT_USERNAME = os.getenv("TELEGRAM_BOT_USERNAME")
+
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -124,6 +165,10 @@ USE_TZ = False
 
 STATIC_URL = "static/"
 
+MEDIA_URL = "media/"
+
+MEDIA_ROOT = BASE_DIR / "media"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -1,82 +1,548 @@
+import asyncio
+import html
+import json
 import logging
 import os
+import socket
 import time
+from collections import OrderedDict
+from datetime import datetime
+from urllib.parse import urlsplit
 
-import requests
+import httpx
+import redis.asyncio as redis
 from telegram import Update
+from telegram.error import RetryAfter, TelegramError
 from telegram.ext import (
     ApplicationBuilder,
     CommandHandler,
     MessageHandler,
     filters,
     CallbackContext,
-    ConversationHandler,
-)
-
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
 )
 
 logger = logging.getLogger(__name__)
 
 user_tokens = {}
-EMAIL = range(1)
 
+# Use the service name as the hostname.
+API_URL = os.environ.get("PLANETARIUM_API_URL") or "http://planetarium:8000"
+TICKETS_BY_EMAIL_PATH = "/api/planetarium/tickets-by-email/"
+MAX_RETRIES = 5
+RETRY_DELAY = 1  # Seconds before the first retry, doubled after each one.
+CACHE_TTL = float(os.environ.get("BOT_CACHE_TTL") or 30)
+CACHE_SIZE = int(os.environ.get("BOT_CACHE_SIZE") or 1024)
+
+# "polling" (the default) or "webhook"; see ``run_webhook``.
+BOT_MODE = os.environ.get("BOT_MODE") or "polling"
+# Updates handled at the same time; the rest wait in the update queue.
+CONCURRENT_UPDATES = int(os.environ.get("BOT_CONCURRENT_UPDATES") or 256)
+# Point the bot at a fake Bot API server in tests and load runs.
+TELEGRAM_API_URL = (
+    os.environ.get("TELEGRAM_API_URL") or "https://api.telegram.org"
+)
+
+# Booking notifications are read from the API's Redis stream; without Redis
+# the bot only answers lookups.
+REDIS_URL = os.environ.get("REDIS_URL") or (
+    f"redis://:{os.environ.get('REDIS_PASSWORD') or ''}"
+    f"@{os.environ['REDIS_HOST']}:{os.environ.get('REDIS_PORT') or 6379}/0"
+    if os.environ.get("REDIS_HOST")
+    else None
+)
+TICKET_EVENTS_STREAM = (
+    os.environ.get("TICKET_EVENTS_STREAM") or "planetarium:ticket-events"
+)
+TICKET_EVENTS_GROUP = "telegram-bot"
+# Unique per replica; entries left pending by a stopped replica are claimed
+# by another one after TICKET_EVENTS_CLAIM_IDLE milliseconds.
+TICKET_EVENTS_CONSUMER = f"{socket.gethostname()}-{os.getpid()}"
+TICKET_EVENTS_CLAIM_IDLE = 60_000
+# A chat accepts emails for this many seconds after its last /start.
+CHAT_STARTED_TTL = int(
+    os.environ.get("BOT_CHAT_STARTED_TTL") or 30 * 24 * 60 * 60
+)
+# Chats stay linked to the email of their last link code for this many
+# seconds.
+CHAT_LINK_TTL = int(os.environ.get("BOT_CHAT_LINK_TTL") or 30 * 24 * 60 * 60)
+NOTIFY_BATCH_DELAY = float(os.environ.get("BOT_NOTIFY_BATCH_DELAY") or 2)
+NOTIFY_MIN_INTERVAL = float(os.environ.get("BOT_NOTIFY_MIN_INTERVAL") or 1)
+NOTIFY_MAX_LINES = 20
+
+
+class LookupCache:
+    """Short-lived LRU cache of lookups with single-flight coalescing.
+
+    At most ``maxsize`` results are kept, each for ``ttl`` seconds; the
+    least recently used one is evicted first. Concurrent lookups of a key
+    that is not cached share one in-flight call, so a burst of identical
+    messages makes a single API request. Failed calls are not cached.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._in_flight = {}
+
+    async def get(self, key, fetch, cacheable=lambda value: True):
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                return value
+            del self._entries[key]
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._in_flight[key] = task
+            task.add_done_callback(
+                lambda task: self._finish(key, task, cacheable)
+            )
+        # A cancelled caller must not cancel the call the others wait for.
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task, cacheable):
+        del self._in_flight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        value = task.result()
+        if cacheable(value):
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class ChatNotifier:
+    """Batches notifications per chat and rate-limits the messages sent.
+
+    Lines added for a chat are collected for ``batch_delay`` seconds and
+    sent as one message, and a chat gets at most one message every
+    ``min_interval`` seconds, or later if Telegram asks to retry after a
+    while. A batch keeps ``max_lines`` lines and counts the rest.
+    """
+
+    # Past send times are forgotten once this many chats are tracked.
+    max_tracked_chats = 10_000
+
+    def __init__(
+        self,
+        bot,
+        batch_delay=NOTIFY_BATCH_DELAY,
+        min_interval=NOTIFY_MIN_INTERVAL,
+        max_lines=NOTIFY_MAX_LINES,
+    ):
+        self.bot = bot
+        self.batch_delay = batch_delay
+        self.min_interval = min_interval
+        self.max_lines = max_lines
+        self._pending = {}
+        self._overflow = {}
+        self._next_send_at = {}
+        self._timers = {}
+        self._tasks = set()
+        self._closed = False
+
+    def add(self, chat_id, lines):
+        self._queue(chat_id, lines)
+        self._schedule(chat_id)
+
+    def _queue(self, chat_id, lines, overflow=0, first=False):
+        """Queue lines after the pending ones, or before them with ``first``.
+
+        Only the first ``max_lines`` are kept; the rest are counted.
+        """
+        pending = self._pending.pop(chat_id, [])
+        lines = lines + pending if first else pending + lines
+        self._pending[chat_id] = lines[: self.max_lines]
+        overflow += len(lines) - len(self._pending[chat_id])
+        if overflow:
+            self._overflow[chat_id] = self._overflow.get(chat_id, 0) + overflow
+
+    def _schedule(self, chat_id):
+        if chat_id in self._timers or self._closed:
+            return
+        delay = max(
+            self.batch_delay,
+            self._next_send_at.get(chat_id, 0) - time.monotonic(),
+        )
+        task = asyncio.create_task(self._flush_later(chat_id, delay))
+        self._timers[chat_id] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
 
-async def start(update: Update, context: CallbackContext) -> int:
+    async def _flush_later(self, chat_id, delay):
+        await asyncio.sleep(delay)
+        # A RetryAfter received meanwhile may have pushed the send back.
+        wait = self._next_send_at.get(chat_id, 0) - time.monotonic()
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self._next_send_at.get(chat_id, 0) - time.monotonic()
+        # Sending from here on, so drain() no longer cancels it.
+        self._timers.pop(chat_id, None)
+        await self._send(chat_id)
+
+    async def _send(self, chat_id):
+        while True:
+            lines = self._pending.pop(chat_id, None)
+            if not lines:
+                return
+            overflow = self._overflow.pop(chat_id, 0)
+            text = "<b>New tickets:</b>\n" + "\n".join(lines)
+            if overflow:
+                text += f"\n…and {overflow} more."
+
+            now = time.monotonic()
+            self._next_send_at[chat_id] = now + self.min_interval
+            if len(self._next_send_at) > self.max_tracked_chats:
+                self._next_send_at = {
+                    chat: at
+                    for chat, at in self._next_send_at.items()
+                    if at > now
+                }
+            try:
+                await self.bot.send_message(chat_id, text, parse_mode="HTML")
+                return
+            except RetryAfter as e:
+                self._next_send_at[chat_id] = time.monotonic() + e.retry_after
+                # Ahead of any lines queued while this batch was in flight.
+                self._queue(chat_id, lines, overflow, first=True)
+                if not self._closed:
+                    self._schedule(chat_id)
+                    return
+                # Draining, so nothing else will send it.
+                await asyncio.sleep(e.retry_after)
+            except TelegramError as e:
+                logger.warning("Could not notify chat %s: %s", chat_id, e)
+                return
+
+    async def drain(self):
+        """Send every pending batch now; nothing is scheduled afterwards.
+
+        A batch Telegram asks to retry is sent again after the wait.
+        """
+        self._closed = True
+        for task in self._timers.values():
+            task.cancel()
+        self._timers.clear()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.gather(
+            *(self._send(chat_id) for chat_id in list(self._pending))
+        )
+
+
+def format_ticket(ticket):
+    show_time = datetime.fromisoformat(ticket["show_time"])
+    return (
+        f"<b>{html.escape(ticket['title'])}</b>, "
+        f"{show_time:%Y-%m-%d %H:%M}, "
+        f"{html.escape(ticket['dome'] or '-')}, "
+        f"Row: {ticket['row']}, "
+        f"Seat: {ticket['seat']}"
+    )
+
+
+def format_tickets(response_data):
+    tickets = response_data.get("data", [])
+    if not tickets:
+        return "You have no tickets yet."
+
+    html_response = "<b>Your tickets:</b>\n"
+    for ticket in tickets:
+        html_response += format_ticket(ticket) + "\n"
+    if response_data.get("next_page"):
+        html_response += "Only the latest tickets are shown.\n"
+    return html_response
+
+
+async def start(update: Update, context: CallbackContext) -> None:
+    # Before the greeting, so the email it asks for is accepted.
+    await mark_chat_started(context, update.effective_chat.id)
+    if context.args:
+        # "/start <code>", sent by a link from the API's telegram-link/.
+        await link_chat_by_code(update, context, context.args[0])
     await update.message.reply_text("Hello! Please enter your email address.")
-    return EMAIL
 
 
-async def handle_email(update: Update, context: CallbackContext) -> int:
+async def handle_email(update: Update, context: CallbackContext) -> None:
+    # Like the conversation this replaced, only chats that sent /start.
+    if not await is_chat_started(context, update.effective_chat.id):
+        return
+
     email = update.message.text
     context.user_data["email"] = email
     await update.message.reply_text("Sending request to the server...")
 
-    return await send_email_request(update, context)
+    await send_email_request(update, context)
 
 
-async def send_email_request(update: Update, context: CallbackContext) -> int:
-    email = context.user_data["email"]
-    url = "http://planetarium:8000/api/planetarium/tickets-by-email/"  # Use the service name as the hostname
-    data = {"email": email}
+async def stop(update: Update, context: CallbackContext) -> None:
+    await unlink_chat(context.application, update.effective_chat.id)
+    await update.message.reply_text(
+        "You will not be notified about new tickets. "
+        "Open a new link from your account to resume."
+    )
+
+
+def started_key(chat_id):
+    return f"planetarium:telegram-started:{chat_id}"
+
+
+async def mark_chat_started(context, chat_id):
+    """Accept emails from the chat, on whichever replica they arrive."""
+    context.chat_data["started"] = True
+    redis_client = context.bot_data.get("redis")
+    if redis_client is None:
+        return
+    try:
+        await redis_client.set(started_key(chat_id), 1, ex=CHAT_STARTED_TTL)
+    except redis.RedisError:
+        logger.exception("Could not start chat %s", chat_id)
+
+
+async def is_chat_started(context, chat_id):
+    if context.chat_data.get("started"):
+        return True
+    redis_client = context.bot_data.get("redis")
+    if redis_client is None:
+        return False
+    try:
+        return bool(await redis_client.exists(started_key(chat_id)))
+    except redis.RedisError:
+        # Answer rather than ignore the chat while Redis is unavailable.
+        logger.exception("Could not check chat %s", chat_id)
+        return True
+
+
+def chat_key(chat_id):
+    return f"planetarium:telegram-chat:{chat_id}"
+
 
-    max_retries = 5
-    retry_delay = 5
+def chats_key(email):
+    return f"planetarium:telegram-chats:{email}"
 
-    for attempt in range(max_retries):
+
+def link_code_key(code):
+    # Written by the API's TelegramLinkView; see api/telegram_links.py.
+    return f"planetarium:telegram-link:{code}"
+
+
+async def link_chat_by_code(update, context, code):
+    """Link the chat to the email a one-time code from the API was issued for.
+
+    Only the owner of an account can get its codes, so a chat is never
+    linked to an email just because someone typed it.
+    """
+    redis_client = context.bot_data.get("redis")
+    if redis_client is None:
+        return
+    try:
+        email = await redis_client.getdel(link_code_key(code))
+    except redis.RedisError:
+        logger.exception("Could not read link code")
+        return
+    if email is None:
+        await update.message.reply_text(
+            "This link has expired or was already used."
+        )
+        return
+    await link_chat(context.application, update.effective_chat.id, email)
+    await update.message.reply_text(
+        f"You will be notified about new tickets of {email}. "
+        "Send /stop to unsubscribe."
+    )
+
+
+async def link_chat(application, chat_id, email):
+    """Move the chat's ticket notifications over to ``email``."""
+    redis_client = application.bot_data.get("redis")
+    if redis_client is None:
+        return
+    try:
+        previous = await redis_client.set(
+            chat_key(chat_id), email, ex=CHAT_LINK_TTL, get=True
+        )
+        async with redis_client.pipeline(transaction=True) as pipe:
+            if previous is not None and previous != email:
+                pipe.srem(chats_key(previous), chat_id)
+            pipe.sadd(chats_key(email), chat_id)
+            pipe.expire(chats_key(email), CHAT_LINK_TTL)
+            await pipe.execute()
+    except redis.RedisError:
+        logger.exception("Could not link chat %s", chat_id)
+
+
+async def unlink_chat(application, chat_id):
+    redis_client = application.bot_data.get("redis")
+    if redis_client is None:
+        return
+    try:
+        email = await redis_client.getdel(chat_key(chat_id))
+        if email is not None:
+            await redis_client.srem(chats_key(email), chat_id)
+    except redis.RedisError:
+        logger.exception("Could not unlink chat %s", chat_id)
+
+
+async def notify_ticket_event(application, fields):
+    event = json.loads(fields["event"])
+    if event.get("type") != "tickets.booked":
+        return
+    redis_client = application.bot_data["redis"]
+    chat_ids = await redis_client.smembers(chats_key(event["email"]))
+    lines = [format_ticket(ticket) for ticket in event["tickets"]]
+    for chat_id in chat_ids:
+        application.bot_data["notifier"].add(int(chat_id), lines)
+
+
+async def consume_ticket_events(application):
+    """Read booking events from the API's stream and notify linked chats.
+
+    Every replica reads through the same consumer group, so each event is
+    delivered to one of them. Entries are acknowledged once their lines are
+    queued in the notifier, which flushes them on shutdown.
+    """
+    redis_client = application.bot_data["redis"]
+    try:
+        await redis_client.xgroup_create(
+            TICKET_EVENTS_STREAM, TICKET_EVENTS_GROUP, id="$", mkstream=True
+        )
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+    claim = True
+    while True:
+        try:
+            if claim:
+                # Entries a stopped replica read but never acknowledged.
+                _, entries, *_ = await redis_client.xautoclaim(
+                    TICKET_EVENTS_STREAM,
+                    TICKET_EVENTS_GROUP,
+                    TICKET_EVENTS_CONSUMER,
+                    min_idle_time=TICKET_EVENTS_CLAIM_IDLE,
+                    count=100,
+                )
+                claim = False
+            else:
+                streams = await redis_client.xreadgroup(
+                    TICKET_EVENTS_GROUP,
+                    TICKET_EVENTS_CONSUMER,
+                    {TICKET_EVENTS_STREAM: ">"},
+                    count=100,
+                    block=5000,
+                )
+                entries = [
+                    entry
+                    for _, stream_entries in streams
+                    for entry in stream_entries
+                ]
+                claim = not entries
+
+            for entry_id, fields in entries:
+                try:
+                    await notify_ticket_event(application, fields)
+                except (KeyError, TypeError, ValueError):
+                    logger.exception(
+                        "Skipping malformed ticket event %s", entry_id
+                    )
+                await redis_client.xack(
+                    TICKET_EVENTS_STREAM, TICKET_EVENTS_GROUP, entry_id
+                )
+        except redis.RedisError:
+            logger.exception("Could not read ticket events")
+            await asyncio.sleep(RETRY_DELAY)
+
+
+async def post_init(application) -> None:
+    # One pooled client for every conversation; requests never block the
+    # event loop and reuse keep-alive connections to the API.
+    application.bot_data["http_client"] = httpx.AsyncClient(
+        base_url=API_URL,
+        timeout=httpx.Timeout(10, connect=5),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
+    application.bot_data["tickets_cache"] = LookupCache()
+
+    if REDIS_URL:
+        application.bot_data["redis"] = redis.Redis.from_url(
+            REDIS_URL, decode_responses=True
+        )
+        application.bot_data["notifier"] = ChatNotifier(application.bot)
+        application.bot_data["ticket_events"] = asyncio.create_task(
+            consume_ticket_events(application)
+        )
+
+
+async def post_shutdown(application) -> None:
+    await application.bot_data["http_client"].aclose()
+
+    if "ticket_events" in application.bot_data:
+        consumer = application.bot_data["ticket_events"]
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+        # The bot is shut down by now; reopen it to send the last batches.
+        async with application.bot:
+            await application.bot_data["notifier"].drain()
+        await application.bot_data["redis"].aclose()
+
+
+async def fetch_tickets(client, email):
+    """POST the email to the API; return the status code and the body.
+
+    The body is the decoded JSON of a successful response and the raw text
+    of any other one.
+    """
+    response = await client.post(TICKETS_BY_EMAIL_PATH, data={"email": email})
+    if response.is_success:
+        return response.status_code, response.json()
+    return response.status_code, response.text
+
+
+async def lookup_tickets(application, email):
+    email = email.strip()
+    return await application.bot_data["tickets_cache"].get(
+        # Spellings of an address that differ only in case share one lookup.
+        email.lower(),
+        lambda: fetch_tickets(application.bot_data["http_client"], email),
+        cacheable=lambda result: 200 <= result[0] < 300,
+    )
+
+
+async def send_email_request(update: Update, context: CallbackContext) -> None:
+    email = context.user_data["email"]
+
+    for attempt in range(MAX_RETRIES):
         try:
-            response = requests.post(url, data=data)
+            status_code, body = await lookup_tickets(
+                context.application, email
+            )
 
-            if response.status_code in range(200, 300):
-                response_data = response.json()
+            if 200 <= status_code < 300:
+                response_data = body
                 if response_data.get("status") == "success":
-                    tickets = response_data.get("data", [])
-                    html_response = "<b>API Response:</b>\n"
-                    for ticket in tickets:
-                        html_response += (
-                            f"ID: {ticket['id']}, "
-                            f"Row: {ticket['row']}, "
-                            f"Seat: {ticket['seat']}, "
-                            f"Show Session: {ticket['show_session_id']}, "
-                            f"Reservation: {ticket['reservation_id']}\n"
-                        )
-                    await update.message.reply_text(html_response, parse_mode="HTML")
+                    await update.message.reply_text(
+                        format_tickets(response_data), parse_mode="HTML"
+                    )
                 else:
                     await update.message.reply_text(
                         f'Error: {response_data.get("message", "Unknown error")}'
                     )
             else:
                 await update.message.reply_text(
-                    f"Error occurred while making a request to the API: {response.status_code} {response.text}"
+                    "Error occurred while making a request to the API: "
+                    f"{status_code} {body}"
                 )
             break
-        except Exception as e:
-            if attempt < max_retries - 1:
+        except (httpx.HTTPError, ValueError) as e:
+            if attempt < MAX_RETRIES - 1:
                 await update.message.reply_text(
                     f"Error occurred while making a request to the API: {str(e)}. Retrying..."
                 )
-                time.sleep(retry_delay)
+                await asyncio.sleep(RETRY_DELAY * 2**attempt)
             else:
                 await update.message.reply_text(
                     f"Error occurred while making a request to the API: {str(e)}. No more retries left."
@@ -84,25 +550,63 @@ async def send_email_request(update: Update, context: CallbackContext) -> int:
                 break
 
     await update.message.reply_text("Enter a new email address or /start to restart.")
-    return EMAIL
+
+
+def run_webhook(application) -> None:
+    """Serve updates pushed by Telegram instead of long polling.
+
+    ``BOT_WEBHOOK_URL`` is the public URL Telegram posts to, usually a load
+    balancer in front of several replicas; every replica listens on
+    ``BOT_WEBHOOK_LISTEN``:``BOT_WEBHOOK_PORT`` at the same path. Requests
+    without the ``BOT_WEBHOOK_SECRET`` header are rejected. On SIGTERM the
+    listener is closed first, then pending and in-flight updates are
+    processed before the process exits.
+    """
+    webhook_url = os.environ["BOT_WEBHOOK_URL"]
+    application.run_webhook(
+        listen=os.environ.get("BOT_WEBHOOK_LISTEN") or "0.0.0.0",
+        port=int(os.environ.get("BOT_WEBHOOK_PORT") or 8443),
+        url_path=urlsplit(webhook_url).path.lstrip("/"),
+        webhook_url=webhook_url,
+        secret_token=os.environ.get("BOT_WEBHOOK_SECRET") or None,
+        max_connections=int(
+            os.environ.get("BOT_WEBHOOK_MAX_CONNECTIONS") or 40
+        ),
+    )
 
 
 def main() -> None:
+    logging.basicConfig(
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        level=logging.INFO,
+    )
     token = os.environ.get("TELEGRAM_TOKEN")
 
-    application = ApplicationBuilder().token(token).build()
-
-    conv_handler = ConversationHandler(
-        entry_points=[CommandHandler("start", start)],
-        states={
-            EMAIL: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_email)],
-        },
-        fallbacks=[CommandHandler("start", start)],
+    application = (
+        ApplicationBuilder()
+        .token(token)
+        .base_url(f"{TELEGRAM_API_URL}/bot")
+        .base_file_url(f"{TELEGRAM_API_URL}/file/bot")
+        .concurrent_updates(CONCURRENT_UPDATES)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
     )
 
-    application.add_handler(conv_handler)
+    # Plain handlers rather than a ConversationHandler, which needs updates
+    # to be processed one by one: the only state of the email flow is the
+    # chat's last email, so updates of one chat can be handled concurrently
+    # and by any replica.
+    application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("stop", stop))
+    application.add_handler(
+        MessageHandler(filters.TEXT & ~filters.COMMAND, handle_email)
+    )
 
-    application.run_polling()
+    if BOT_MODE == "webhook":
+        run_webhook(application)
+    else:
+        application.run_polling()
 
 
 if __name__ == "__main__":